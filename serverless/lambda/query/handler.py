@@ -4,6 +4,7 @@ Supports violation, fulfillment, and team semantics queries
 """
 
 import json
+import functools
 import boto3
 from typing import Dict, Any, List, Optional
 
@@ -12,24 +13,114 @@ dynamodb = boto3.resource('dynamodb')
 s3 = boto3.client('s3')
 
 # Table names (from environment variables)
-CONTRACTS_TABLE = dynamodb.Table('Contracts')
-PREDICATES_TABLE = dynamodb.Table('Predicates')
-SOLUTIONS_TABLE = dynamodb.Table('Solutions')
-ANALYSIS_TABLE = dynamodb.Table('AnalysisResults')
+CONTRACTS_TABLE = 'Contracts'
+PREDICATES_TABLE = 'Predicates'
+SOLUTIONS_TABLE = 'Solutions'
+ANALYSIS_TABLE = 'AnalysisResults'
 
 # S3 bucket for vector files
 VECTORS_BUCKET = 'laml-contracts-service'
 
 
+@functools.lru_cache(maxsize=8)
+def table(name: str):
+    """
+    Return a DynamoDB Table handle, created on first use
+
+    Building a Table resource loads its service model, so handles are
+    created lazily and reused across warm invocations instead of at import.
+    """
+    return dynamodb.Table(name)
+
+
+def _decode_string_list(attr: Optional[Dict[str, Any]]) -> List[str]:
+    """Decode a low-level list (L of S) or string set (SS) attribute"""
+    if not attr:
+        return []
+    if 'SS' in attr:
+        return attr['SS']
+    return [value['S'] for value in attr.get('L', [])]
+
+
+def _query_all_items(dynamo_table, **kwargs) -> List[Dict[str, Any]]:
+    """
+    Run a Table query and return the items of every page
+
+    A single query call stops at 1 MB of data, so pages are followed
+    through LastEvaluatedKey until DynamoDB reports no more.
+    """
+    items = []
+    while True:
+        response = dynamo_table.query(**kwargs)
+        items.extend(response['Items'])
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return items
+        kwargs['ExclusiveStartKey'] = last_key
+
+
+def query_solutions(contract_id: str) -> List[Dict[str, Any]]:
+    """
+    Fetch solution_id and predicate_ids for every solution of a contract
+
+    Uses the low-level client with a projection and decodes only those two
+    attributes, instead of letting the Resource layer deserialize every
+    attribute of every item.
+    """
+    pages = dynamodb.meta.client.get_paginator('query').paginate(
+        TableName=SOLUTIONS_TABLE,
+        KeyConditionExpression='contract_id = :cid',
+        ExpressionAttributeValues={':cid': {'S': contract_id}},
+        ProjectionExpression='solution_id, predicate_ids'
+    )
+    
+    return [
+        {
+            'solution_id': item['solution_id']['S'],
+            'predicate_ids': _decode_string_list(item.get('predicate_ids'))
+        }
+        for page in pages
+        for item in page['Items']
+    ]
+
+
+def build_predicate_bitmaps(solutions: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Index solutions as one bitmap per predicate
+    
+    Bit i of bitmaps[predicate_id] is set when solutions[i] contains the
+    predicate, so counting the target solutions that contain it is a single
+    AND plus a popcount (int.bit_count) instead of a scan over solutions.
+    
+    Bits are set in one fixed-size bytearray per predicate and converted to
+    an int once at the end; OR-ing into growing ints would cost O(S) per
+    membership.
+    """
+    row_bytes = (len(solutions) + 7) >> 3
+    rows: Dict[str, bytearray] = {}
+    for position, solution in enumerate(solutions):
+        byte_index = position >> 3
+        bit = 1 << (position & 7)
+        for pred_id in solution.get('predicate_ids', []):
+            row = rows.get(pred_id)
+            if row is None:
+                row = rows[pred_id] = bytearray(row_bytes)
+            row[byte_index] |= bit
+    
+    return {pred_id: int.from_bytes(row, 'little') for pred_id, row in rows.items()}
+
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Main Lambda handler for contract queries
     
     Expected event structure:
     {
-        "query_type": "violation" | "fulfillment" | "team_semantics",
+        "query_type": "violation" | "fulfillment" | "violation_batch" |
+                      "fulfillment_batch" | "team_semantics",
         "contract_id": "string",
         "predicate_name": "string",
+        "predicate_names": ["string", ...],   # *_batch query types
         "query_params": {...}
     }
     """
@@ -50,6 +141,19 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             result = analyze_violation(contract_id, predicate_name)
         elif query_type == 'fulfillment':
             result = analyze_fulfillment(contract_id, predicate_name)
+        elif query_type in ('violation_batch', 'fulfillment_batch'):
+            predicate_names = event.get('predicate_names')
+            if not isinstance(predicate_names, list) or not predicate_names:
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({
+                        'error': 'Missing required parameter: predicate_names'
+                    })
+                }
+            if query_type == 'violation_batch':
+                result = analyze_violations_batch(contract_id, predicate_names)
+            else:
+                result = analyze_fulfillments_batch(contract_id, predicate_names)
         elif query_type == 'team_semantics':
             result = analyze_team_semantics(contract_id, event.get('query_params', {}))
         else:
@@ -75,6 +179,38 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
 
 
+def load_contract_data(contract_id: str, predicate_names: List[str]) -> Dict[str, Any]:
+    """
+    Fetch a contract's predicates and solutions once and index them
+    
+    The returned bundle carries everything the violation/fulfillment analyses
+    need, so several predicates can be analyzed against a single pair of
+    DynamoDB queries. Solutions are only fetched when at least one of
+    predicate_names exists in the contract; otherwise every analysis returns
+    its not-found result and the bundle indexes no solutions.
+    """
+    predicates = _query_all_items(
+        table(PREDICATES_TABLE),
+        KeyConditionExpression='contract_id = :cid',
+        ExpressionAttributeValues={':cid': contract_id}
+    )
+    
+    predicates_by_name = {}
+    for pred_item in predicates:
+        predicates_by_name.setdefault(pred_item['predicate_name'], pred_item)
+    
+    solutions = []
+    if any(name in predicates_by_name for name in predicate_names):
+        solutions = query_solutions(contract_id)
+    
+    return {
+        'predicates': predicates,
+        'predicates_by_name': predicates_by_name,
+        'predicate_bitmaps': build_predicate_bitmaps(solutions),
+        'all_solutions_mask': (1 << len(solutions)) - 1
+    }
+
+
 def analyze_violation(contract_id: str, predicate_name: str) -> Dict[str, Any]:
     """
     Analyze violation consequences for a predicate
@@ -83,17 +219,34 @@ def analyze_violation(contract_id: str, predicate_name: str) -> Dict[str, Any]:
     1. Solutions where predicate is absent
     2. Other predicates that are always present/absent in violation scenarios
     """
-    # Get predicate ID
-    predicate_response = PREDICATES_TABLE.query(
-        IndexName='predicate_name-index',
-        KeyConditionExpression='predicate_name = :name AND contract_id = :cid',
-        ExpressionAttributeValues={
-            ':name': predicate_name,
-            ':cid': contract_id
-        }
-    )
+    return violation_from_contract_data(load_contract_data(contract_id, [predicate_name]), predicate_name)
+
+
+def analyze_violations_batch(contract_id: str, predicate_names: List[str]) -> Dict[str, Any]:
+    """
+    Analyze violation consequences for several predicates of one contract
+    
+    Predicates and solutions are fetched once; each predicate then only costs
+    a few bitmap operations.
+    """
+    contract_data = load_contract_data(contract_id, predicate_names)
+    results = [
+        violation_from_contract_data(contract_data, predicate_name)
+        for predicate_name in predicate_names
+    ]
     
-    if not predicate_response['Items']:
+    return {
+        'contract_id': contract_id,
+        'results': results,
+        'num_results': len(results)
+    }
+
+
+def violation_from_contract_data(contract_data: Dict[str, Any], predicate_name: str) -> Dict[str, Any]:
+    """Violation analysis for one predicate over prefetched contract data"""
+    pred_item = contract_data['predicates_by_name'].get(predicate_name)
+    
+    if not pred_item:
         return {
             'predicate': predicate_name,
             'total_violation_scenarios': 0,
@@ -101,23 +254,12 @@ def analyze_violation(contract_id: str, predicate_name: str) -> Dict[str, Any]:
             'message': f"Predicate '{predicate_name}' not found in contract"
         }
     
-    predicate_id = predicate_response['Items'][0]['predicate_id']
-    
-    # Get all solutions for this contract
-    all_solutions = SOLUTIONS_TABLE.query(
-        KeyConditionExpression='contract_id = :cid',
-        ExpressionAttributeValues={':cid': contract_id}
-    )
-    
-    # Get solutions containing the predicate
-    fulfillment_solutions = set()
-    for solution in all_solutions['Items']:
-        if predicate_id in solution.get('predicate_ids', []):
-            fulfillment_solutions.add(solution['solution_id'])
+    predicate_id = pred_item['predicate_id']
     
     # Violation scenarios = all solutions - fulfillment solutions
-    total_solutions = len(all_solutions['Items'])
-    violation_count = total_solutions - len(fulfillment_solutions)
+    fulfillment_mask = contract_data['predicate_bitmaps'].get(predicate_id, 0)
+    violation_mask = contract_data['all_solutions_mask'] & ~fulfillment_mask
+    violation_count = violation_mask.bit_count()
     
     if violation_count == 0:
         return {
@@ -128,23 +270,16 @@ def analyze_violation(contract_id: str, predicate_name: str) -> Dict[str, Any]:
         }
     
     # Find predicates that are always present/absent in violation scenarios
-    violation_solution_ids = {
-        sol['solution_id'] 
-        for sol in all_solutions['Items'] 
-        if sol['solution_id'] not in fulfillment_solutions
-    }
-    
-    # Analyze consequences
-    consequences = analyze_consequences(
-        contract_id, 
-        violation_solution_ids, 
+    consequences = consequences_from_contract_data(
+        contract_data,
+        violation_mask,
         predicate_id
     )
     
     return {
         'predicate': predicate_name,
         'total_violation_scenarios': violation_count,
-        'total_fulfillment_scenarios': len(fulfillment_solutions),
+        'total_fulfillment_scenarios': fulfillment_mask.bit_count(),
         'consequences': consequences,
         'num_consequences': len(consequences)
     }
@@ -155,17 +290,32 @@ def analyze_fulfillment(contract_id: str, predicate_name: str) -> Dict[str, Any]
     Analyze fulfillment consequences for a predicate
     Similar to violation analysis but for fulfillment scenarios
     """
-    # Get predicate ID
-    predicate_response = PREDICATES_TABLE.query(
-        IndexName='predicate_name-index',
-        KeyConditionExpression='predicate_name = :name AND contract_id = :cid',
-        ExpressionAttributeValues={
-            ':name': predicate_name,
-            ':cid': contract_id
-        }
-    )
+    return fulfillment_from_contract_data(load_contract_data(contract_id, [predicate_name]), predicate_name)
+
+
+def analyze_fulfillments_batch(contract_id: str, predicate_names: List[str]) -> Dict[str, Any]:
+    """
+    Analyze fulfillment consequences for several predicates of one contract
+    Shares a single predicates/solutions fetch, like analyze_violations_batch
+    """
+    contract_data = load_contract_data(contract_id, predicate_names)
+    results = [
+        fulfillment_from_contract_data(contract_data, predicate_name)
+        for predicate_name in predicate_names
+    ]
+    
+    return {
+        'contract_id': contract_id,
+        'results': results,
+        'num_results': len(results)
+    }
+
+
+def fulfillment_from_contract_data(contract_data: Dict[str, Any], predicate_name: str) -> Dict[str, Any]:
+    """Fulfillment analysis for one predicate over prefetched contract data"""
+    pred_item = contract_data['predicates_by_name'].get(predicate_name)
     
-    if not predicate_response['Items']:
+    if not pred_item:
         return {
             'predicate': predicate_name,
             'total_fulfillment_scenarios': 0,
@@ -173,22 +323,12 @@ def analyze_fulfillment(contract_id: str, predicate_name: str) -> Dict[str, Any]
             'message': f"Predicate '{predicate_name}' not found in contract"
         }
     
-    predicate_id = predicate_response['Items'][0]['predicate_id']
+    predicate_id = pred_item['predicate_id']
     
-    # Get all solutions for this contract
-    all_solutions = SOLUTIONS_TABLE.query(
-        KeyConditionExpression='contract_id = :cid',
-        ExpressionAttributeValues={':cid': contract_id}
-    )
-    
-    # Get solutions containing the predicate (fulfillment scenarios)
-    fulfillment_solution_ids = {
-        sol['solution_id'] 
-        for sol in all_solutions['Items'] 
-        if predicate_id in sol.get('predicate_ids', [])
-    }
+    # Solutions containing the predicate (fulfillment scenarios)
+    fulfillment_mask = contract_data['predicate_bitmaps'].get(predicate_id, 0)
     
-    if not fulfillment_solution_ids:
+    if not fulfillment_mask:
         return {
             'predicate': predicate_name,
             'total_fulfillment_scenarios': 0,
@@ -197,65 +337,45 @@ def analyze_fulfillment(contract_id: str, predicate_name: str) -> Dict[str, Any]
         }
     
     # Analyze consequences
-    consequences = analyze_consequences(
-        contract_id, 
-        fulfillment_solution_ids, 
+    consequences = consequences_from_contract_data(
+        contract_data,
+        fulfillment_mask,
         predicate_id
     )
     
     return {
         'predicate': predicate_name,
-        'total_fulfillment_scenarios': len(fulfillment_solution_ids),
+        'total_fulfillment_scenarios': fulfillment_mask.bit_count(),
         'consequences': consequences,
         'num_consequences': len(consequences)
     }
 
 
-def analyze_consequences(
-    contract_id: str, 
-    target_solution_ids: set, 
+def consequences_from_contract_data(
+    contract_data: Dict[str, Any],
+    target_mask: int,
     exclude_predicate_id: str
 ) -> List[Dict[str, Any]]:
     """
-    Find predicates that are always present or always absent
-    in the target solution set
+    Find predicates that are always present or always absent in the
+    solutions selected by target_mask
     """
-    # Get all predicates for this contract (excluding target)
-    predicates_response = PREDICATES_TABLE.query(
-        KeyConditionExpression='contract_id = :cid',
-        ExpressionAttributeValues={':cid': contract_id}
-    )
-    
-    # Get all solutions
-    all_solutions = SOLUTIONS_TABLE.query(
-        KeyConditionExpression='contract_id = :cid',
-        ExpressionAttributeValues={':cid': contract_id}
-    )
-    
-    # Build solution map
-    solution_map = {
-        sol['solution_id']: set(sol.get('predicate_ids', []))
-        for sol in all_solutions['Items']
-        if sol['solution_id'] in target_solution_ids
-    }
-    
-    if not solution_map:
+    if not target_mask:
         return []
     
+    predicate_bitmaps = contract_data['predicate_bitmaps']
+    
     # Analyze each predicate
     consequences = []
-    total_target_solutions = len(target_solution_ids)
+    total_target_solutions = target_mask.bit_count()
     
-    for pred_item in predicates_response['Items']:
+    for pred_item in contract_data['predicates']:
         pred_id = pred_item['predicate_id']
         if pred_id == exclude_predicate_id:
             continue
         
         # Count how many target solutions contain this predicate
-        count_with_predicate = sum(
-            1 for sol_set in solution_map.values()
-            if pred_id in sol_set
-        )
+        count_with_predicate = (predicate_bitmaps.get(pred_id, 0) & target_mask).bit_count()
         
         # Determine consequence type
         if count_with_predicate == total_target_solutions:
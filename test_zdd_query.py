@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Tests for the zdd_query indexes, caches and byte-level parsers
+
+Run with: python -m unittest test_zdd_query
+"""
+
+import io
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+import zdd_query as zq
+
+
+def _random_vectors(rng, count, max_id=12):
+    """Random sorted ID vectors, some empty, over IDs 1..max_id"""
+    return [sorted(rng.sample(range(1, max_id + 1), rng.randint(0, 6))) for _ in range(count)]
+
+
+def _quiet(func, *args, **kwargs):
+    """Call func with stdout captured; return (result, printed text)"""
+    with redirect_stdout(io.StringIO()) as out:
+        result = func(*args, **kwargs)
+    return result, out.getvalue()
+
+
+class TempDirTestCase(unittest.TestCase):
+    """Gives each test a scratch directory and a helper to write files into it"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, data):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'wb') as f:
+            f.write(data.encode() if isinstance(data, str) else data)
+        return path
+
+
+class IndexedQueryTests(unittest.TestCase):
+    """The bitmap index paths must agree with the plain vector scans"""
+
+    def setUp(self):
+        self.rng = random.Random(7)
+        self.contract_map = {i: {'description': f'contract {i}'} for i in range(0, 15)}
+
+    def test_query_vectors_indexed_matches_scan(self):
+        for _ in range(200):
+            vectors = _random_vectors(self.rng, self.rng.randint(1, 40))
+            index = zq.build_vector_index(vectors)
+            required = self.rng.sample(range(1, 14), self.rng.randint(0, 3))
+            forbidden = self.rng.sample(range(1, 14), self.rng.randint(0, 2))
+            allowed = set(self.rng.sample(range(1, 14), 8)) if self.rng.random() < 0.3 else None
+            max_print = self.rng.choice([1, 5, 100])
+
+            scanned, _ = _quiet(zq.query_vectors, vectors, required, forbidden,
+                                self.contract_map, allowed, max_print)
+            indexed, _ = _quiet(zq.query_vectors, vectors, required, forbidden,
+                                self.contract_map, allowed, max_print, index=index)
+            self.assertEqual([list(v) for v in scanned[0]], [list(v) for v in indexed[0]])
+            self.assertEqual(set(scanned[1]), set(indexed[1]))
+
+    def test_large_ids_use_the_column_path(self):
+        vectors = [[1, zq.ROW_BITMAP_MAX_ID], [1, 2], [2, 10 ** 6]]
+        index = zq.build_vector_index(vectors)
+        self.assertIsNone(index['rows'])
+        self.assertIsNotNone(zq.build_vector_index([[1, 2], [3]])['rows'])
+        for required in ([1], [2], [10 ** 6], []):
+            scanned, _ = _quiet(zq.query_vectors, vectors, required, [], self.contract_map)
+            indexed, _ = _quiet(zq.query_vectors, vectors, required, [], self.contract_map, index=index)
+            self.assertEqual([list(v) for v in scanned[0]], [list(v) for v in indexed[0]])
+            self.assertEqual(set(scanned[1]), set(indexed[1]))
+
+    def test_split_vectors_indexed_matches_scan(self):
+        for _ in range(100):
+            vectors = _random_vectors(self.rng, self.rng.randint(1, 40))
+            index = zq.build_vector_index(vectors)
+            id1, id2 = self.rng.sample(range(1, 14), 2)
+
+            scanned, scanned_out = _quiet(zq.split_vectors, vectors, id1, id2, self.contract_map)
+            indexed, indexed_out = _quiet(zq.split_vectors, vectors, id1, id2, self.contract_map, index=index)
+            self.assertEqual(scanned, indexed)
+            self.assertEqual(scanned_out, indexed_out)
+
+    def test_permissive_vectors_indexed_matches_scan(self):
+        for _ in range(100):
+            vectors = _random_vectors(self.rng, self.rng.randint(1, 40))
+            index = zq.build_vector_index(vectors)
+            id1, id2 = self.rng.sample(range(1, 14), 2)
+
+            scanned, scanned_out = _quiet(zq.permissive_vectors, vectors, id1, id2, self.contract_map)
+            indexed, indexed_out = _quiet(zq.permissive_vectors, vectors, id1, id2, self.contract_map, index=index)
+            self.assertEqual(dict(scanned[0]), dict(indexed[0]))
+            self.assertEqual(scanned[1], indexed[1])
+            self.assertEqual(scanned_out, indexed_out)
+
+
+    def test_simulate_attack_indexed_matches_scan(self):
+        for _ in range(100):
+            team = [vector for vector in _random_vectors(self.rng, self.rng.randint(1, 40)) if vector]
+            if not team:
+                continue
+            target = self.rng.randint(1, 13)
+            scanned = zq.simulate_attack_impact(team, target, self.contract_map)
+            indexed = zq.simulate_attack_impact(team, target, self.contract_map,
+                                                index=zq.build_vector_index(team))
+            self.assertEqual(sorted(scanned.pop('new_core', [])), sorted(indexed.pop('new_core', [])))
+            self.assertEqual(scanned, indexed)
+
+
+class CountVectorLinesTests(TempDirTestCase):
+    """count_vector_lines counts lines that are neither blank nor '#' comments"""
+
+    CASES = [
+        ('', 0),
+        ('[1, 2]', 1),                          # no trailing newline
+        ('[1, 2]\n[3]\n', 2),
+        ('\n\n[1]\n\n\n[2]\n\n', 2),            # blank lines, including consecutive ones
+        ('  \n\t\n[1]\r\n\r\n', 1),             # whitespace-only and CRLF blank lines
+        ('# header\n[1]\n#[2]\n', 1),           # comments, even bracketed ones
+        (' # indented\n', 1),                   # only a '#' in column one is a comment
+        ('[]\n[]', 2),                          # empty vectors still count
+        ('[1]\n#tail', 1),                      # unterminated final comment
+        ('[1]\n   ', 1),                        # unterminated final blank line
+    ]
+
+    def check_cases(self):
+        for data, expected in self.CASES:
+            with self.subTest(data=data):
+                self.assertEqual(zq.count_vector_lines(self.write('vectors.txt', data)), expected)
+
+    def test_edge_cases(self):
+        self.check_cases()
+
+    def test_edge_cases_across_chunk_boundaries(self):
+        original = zq.COUNT_CHUNK_SIZE
+        try:
+            for chunk_size in (2, 3, 7):
+                zq.COUNT_CHUNK_SIZE = chunk_size
+                self.check_cases()
+        finally:
+            zq.COUNT_CHUNK_SIZE = original
+
+    @unittest.skipIf(shutil.which('grep') is None, "grep is not available")
+    def test_grep_path_matches_python_scan(self):
+        original = zq.EXTERNAL_COUNT_MIN_SIZE
+        try:
+            zq.EXTERNAL_COUNT_MIN_SIZE = 0
+            self.check_cases()
+        finally:
+            zq.EXTERNAL_COUNT_MIN_SIZE = original
+
+
+class ParseIdListTests(unittest.TestCase):
+
+    def test_well_formed_lists(self):
+        self.assertEqual(zq._parse_id_list('[1,-2,3]'), [1, -2, 3])
+        self.assertEqual(zq._parse_id_list('[ 1, -2 , 3 ]'), [1, -2, 3])
+        self.assertEqual(zq._parse_id_list('7'), [7])
+
+    def test_empty_lists_and_items(self):
+        self.assertEqual(zq._parse_id_list('[]'), [])
+        self.assertEqual(zq._parse_id_list('[1,,2,]'), [1, 2])
+
+    def test_malformed_items_raise(self):
+        for id_list in ('[1 2, 3]', '[1,', '2]', '[[1]]', '[a]', '[1.5]', '[1;2]'):
+            with self.subTest(id_list=id_list):
+                with self.assertRaises(ValueError):
+                    zq._parse_id_list(id_list)
+
+
+class CommandIdListTests(TempDirTestCase):
+    """A list split across shell words must be rejected, not read as a shorter list"""
+
+    def setUp(self):
+        super().setUp()
+        path = self.write('vectors.txt', "# Final results\n# ZDD 0: all\n[1, 2, 3]\n[1, 2]\n[2, 3]\n")
+        self.vectors, _ = _quiet(zq.load_vectors_from_file, path)
+
+    def run_command(self, command):
+        contract_map = {i: {'description': f'contract {i}'} for i in range(5)}
+        _, out = _quiet(zq.process_command, command, lambda: self.vectors, contract_map,
+                        {}, {}, {}, {}, {}, {}, {}, {})
+        return out
+
+    def test_spaced_lists_are_rejected(self):
+        cases = [
+            ('analyze_team [1, 2, 3]', "Error parsing elements: invalid literal"),
+            ('compare_teams [1, 2] [3]', "Error parsing teams: invalid literal"),
+            ('path [1 2]', "Error: Invalid path format"),
+        ]
+        for command, error in cases:
+            with self.subTest(command=command):
+                out = self.run_command(command)
+                self.assertIn(error, out)
+                self.assertNotIn("TEAM SEMANTIC ANALYSIS", out)
+                self.assertNotIn("LEGAL ARGUMENT STRATEGY", out)
+
+    def test_unspaced_lists_still_run(self):
+        self.assertIn("TEAM SEMANTIC ANALYSIS", self.run_command('analyze_team [1,2]'))
+        self.assertNotIn("Error", self.run_command('path [1,2]'))
+
+
+class TeamCacheTests(unittest.TestCase):
+    """Cached team analyses must never be served for a different team"""
+
+    def setUp(self):
+        self.contract_map = {i: {'description': f'contract {i}'} for i in range(-5, 10)}
+
+    def test_colliding_hashes_do_not_share_analysis(self):
+        team1, team2 = [[-1, 5]], [[-2, 5]]
+        self.assertEqual(hash(tuple(map(tuple, team1))), hash(tuple(map(tuple, team2))))
+
+        analysis1 = zq.team_semantic_analysis(team1, self.contract_map)
+        analysis2 = zq.team_semantic_analysis(team2, self.contract_map)
+        self.assertEqual(sorted(analysis1['core_elements']), [-1, 5])
+        self.assertEqual(sorted(analysis2['core_elements']), [-2, 5])
+
+    def test_colliding_hashes_do_not_share_strategy(self):
+        strategy1 = zq.generate_argument_strategy([[-1, 5]], [[5]], self.contract_map)
+        strategy2 = zq.generate_argument_strategy([[-2, 5]], [[5]], self.contract_map)
+        self.assertEqual(sorted(strategy1['must_establish']), [-1, 5])
+        self.assertEqual(sorted(strategy2['must_establish']), [-2, 5])
+
+    def test_cache_hit_returns_own_top_level_dict(self):
+        team = [[1, 2], [1, 3]]
+        analysis = zq.team_semantic_analysis(team, self.contract_map)
+        analysis['team_name'] = 'changed'
+        self.assertEqual(zq.team_semantic_analysis(team, self.contract_map)['team_name'], 'Team')
+
+    def test_cache_is_bounded_by_total_team_size(self):
+        original = zq.ANALYSIS_CACHE_BUDGET
+        try:
+            zq.ANALYSIS_CACHE_BUDGET = 10
+            zq.team_semantic_analysis([[1]] * 20, self.contract_map, 'too big')
+            self.assertNotIn(('analysis', zq._team_fingerprint([[1]] * 20), 'too big'), zq._analysis_cache)
+            for size in range(1, 6):
+                zq.team_semantic_analysis([[size]] * size, self.contract_map, 'bounded')
+                self.assertLessEqual(zq._analysis_cache_cost, 10)
+            self.assertEqual(zq._analysis_cache_cost,
+                             sum(entry[3] for entry in zq._analysis_cache.values()))
+        finally:
+            zq.ANALYSIS_CACHE_BUDGET = original
+
+
+class ReloadInvalidationTests(TempDirTestCase):
+    """Caches and indexes over the loaded vectors must follow a reload"""
+
+    # load_vectors_from_file skips a leading header line, as in real result files
+    FIRST = "# Final results\n# ZDD 0: first\n[1, 2]\n[1, 3]\n[2, 3]\n"
+    SECOND = "# Final results\n# ZDD 0: second\n[1, 2]\n[4]\n"
+
+    def load(self, data):
+        vectors, _ = _quiet(zq.load_vectors_from_file, self.write('vectors.txt', data))
+        return vectors
+
+    def test_loaded_index_follows_reload(self):
+        self.load(self.FIRST)
+        self.assertEqual(zq._loaded_vector_index()['size'], 3)
+        vectors = self.load(self.SECOND)
+        index = zq._loaded_vector_index()
+        self.assertEqual(index['size'], 2)
+        found, _ = _quiet(zq.query_vectors, vectors, [4], [], {}, index=index)
+        self.assertEqual([list(v) for v in found[0]], [[4]])
+
+    def test_zdd_aware_cache_follows_reload(self):
+        self.load(self.FIRST)
+        first = zq._zdd_consequences_cached((1,), ())
+        self.assertEqual(first[1], 2)
+        self.assertEqual(first[0][0]['zdd_name'], 'first')
+        self.load(self.SECOND)
+        second = zq._zdd_consequences_cached((1,), ())
+        self.assertEqual(second[1], 1)
+        self.assertEqual(second[0][0]['zdd_name'], 'second')
+        self.assertEqual(second[2], zq.query_vectors_zdd_aware([1], [], {})[2])
+
+    def test_permissive_counts_follow_reload(self):
+        contract_map = {i: {'description': f'contract {i}'} for i in range(5)}
+        vectors = self.load(self.FIRST)
+        (first, _), _ = _quiet(zq.permissive_vectors, vectors, 1, 2, contract_map,
+                               index=zq._loaded_vector_index())
+        self.assertEqual(dict(first), {(True, True): 1, (True, False): 1, (False, True): 1})
+
+        vectors = self.load(self.SECOND)
+        (second, _), _ = _quiet(zq.permissive_vectors, vectors, 2, 1, contract_map,
+                                index=zq._loaded_vector_index())
+        self.assertEqual(dict(second), {(True, True): 1, (False, False): 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,28 +5,81 @@ Combines ZDD query functionality with team semantics legal argument analysis
 """
 
 import sys
+import io
 import re
 import json
+import logging
 import os
-from collections import defaultdict
+import stat
+import shutil
+import subprocess
+from collections import defaultdict, OrderedDict
+from itertools import islice
+from contextlib import contextmanager, redirect_stdout
 import shlex
-from typing import List, Set, Dict, Tuple, Optional, Any
+from functools import reduce, lru_cache
+import heapq
+from operator import or_
+from typing import List, Set, FrozenSet, Dict, Tuple, Optional, Any
 
 MAX_VECTORS_TO_PRINT = 100000
+ANALYSIS_CACHE_BUDGET = 1 << 22  # vectors referenced by cached team analyses, summed over entries
+ROW_BITMAP_MAX_ID = 1 << 10  # per-vector ID bitmaps are only built below this ID
+COUNT_CHUNK_SIZE = 1 << 20  # bytes per read when counting vector lines
+EXTERNAL_COUNT_MIN_SIZE = 16 << 20  # files this large are counted by grep when available
+REPL_CACHE_SIZE = 64  # interactive command outputs kept for replay
+HISTORY_FILE = os.path.expanduser('~/.zdd_query_history')
+
+# Diagnostics go to stderr through logging; main sets the level from $ZDD_LOG
+log = logging.getLogger("zdd_query")
+
+# Bracketed vector payload on a vector file line, e.g. "[1, 2, 3]"
+_VEC_RE = re.compile(r'\[([^\]]*)\]')
+_PAREN_TAG_RE = re.compile(r'\s*\([^)]*\)\s*')
+# A complete blank or comment line in raw file bytes; such lines are not vectors
+_SKIP_LINE_RE = re.compile(rb'(?:#[^\n]*|[ \t\r\f\v]*)\n')
+# A newline that starts a blank or comment line. Leading with the literal lets
+# the scan jump from newline to newline instead of trying every byte offset
+_SKIP_NEXT_LINE_RE = re.compile(rb'\n(?=#|[ \t\r\f\v]*\n)')
+
+# Start of a line a command prints when it fails; such output is never replayed
+_ERROR_LINE_RE = re.compile(r'^(?:Error|Unknown command)', re.MULTILINE)
+
+class Vector(list):
+    """A loaded vector: its ID list, plus a frozenset of the IDs built on first use"""
+    __slots__ = ('_ids_set',)
+    
+    @property
+    def ids_set(self) -> FrozenSet[int]:
+        # Only team analysis reads this, so most loaded vectors never pay for it
+        try:
+            return self._ids_set
+        except AttributeError:
+            ids_set = self._ids_set = frozenset(self)
+            return ids_set
+
+# Set by load_vectors_from_file: per-ZDD groups and all loaded vectors. The
+# index over all vectors is built from _loaded_vectors on first use
+_zdd_groups = []
+_loaded_vectors = []
+_vector_index = None
 
 # ==================== TEAM SEMANTICS ALGORITHMS ====================
+#
+# Teams are lists of vectors. The per-variable measures below only test
+# membership, so they accept either the original List[List[int]] or the
+# frozenset view produced by _freeze_team(); analyses that call several of
+# them freeze the team once and pass the frozen view around.
+
+def _freeze_team(team: List[List[int]]) -> List[FrozenSet[int]]:
+    """Return the team as one frozenset per vector for O(1) membership tests"""
+    return [vector.ids_set if isinstance(vector, Vector) else frozenset(vector) for vector in team]
 
 def dependency_measure(X: int, team: List[List[int]]) -> int:
     """Measures how much team collapses when variable X is removed"""
-    original_size = len(team)
-    
-    team_without_X = []
-    for vector in team:
-        v_without_X = [v for v in vector if v != X]
-        if v_without_X not in team_without_X:
-            team_without_X.append(v_without_X)
-    
-    return original_size - len(team_without_X)
+    removed = frozenset((X,))
+    team_without_X = {frozenset(vector) - removed for vector in team}
+    return len(team) - len(team_without_X)
 
 def essential_variable(X: int, team: List[List[int]]) -> bool:
     """Test if X appears in every vector"""
@@ -40,13 +93,7 @@ def core_elements(team: List[List[int]]) -> List[int]:
     if not team:
         return []
     
-    core_variables = set(team[0])
-    for vector in team[1:]:
-        core_variables = core_variables.intersection(set(vector))
-        if not core_variables:
-            break
-    
-    return list(core_variables)
+    return list(frozenset.intersection(*_freeze_team(team)))
 
 def universal_support(X: int, team: List[List[int]]) -> float:
     """Proportion of vectors containing X"""
@@ -82,28 +129,85 @@ def criticality(X: int, team: List[List[int]]) -> float:
     """Combined fragility and leverage measure"""
     return fragility(X, team) * leverage(X, team)
 
+def _team_keys(team: List[List[int]]) -> Set[Tuple[int, ...]]:
+    """Hashable keys for the vectors of a team, for O(1) team membership"""
+    return {tuple(vector) for vector in team}
+
 def attack_surface(team_phi: List[List[int]], team_psi: List[List[int]]) -> List[List[int]]:
     """Intersection of compliant teams"""
-    return [v for v in team_phi if v in team_psi]
+    psi_keys = _team_keys(team_psi)
+    return [v for v in team_phi if tuple(v) in psi_keys]
 
 def defense_space(team_phi: List[List[int]], team_psi: List[List[int]]) -> List[List[int]]:
     """Vectors unique to team_phi"""
-    return [v for v in team_phi if v not in team_psi]
+    psi_keys = _team_keys(team_psi)
+    return [v for v in team_phi if tuple(v) not in psi_keys]
+
+def partition_team(team_phi: List[List[int]], team_psi: List[List[int]]) -> Tuple[List[List[int]], List[List[int]]]:
+    """attack_surface and defense_space of team_phi against team_psi in one pass"""
+    psi_keys = _team_keys(team_psi)
+    contested, defense = [], []
+    for v in team_phi:
+        (contested if tuple(v) in psi_keys else defense).append(v)
+    return contested, defense
 
 def team_intersection(team_phi: List[List[int]], team_psi: List[List[int]]) -> List[List[int]]:
     """Standard set intersection for teams"""
-    return [v for v in team_phi if v in team_psi]
+    psi_keys = _team_keys(team_psi)
+    return [v for v in team_phi if tuple(v) in psi_keys]
 
 def team_union(team_phi: List[List[int]], team_psi: List[List[int]]) -> List[List[int]]:
     """Standard set union for teams"""
     union = team_phi.copy()
+    seen = _team_keys(team_phi)
     for vector in team_psi:
-        if vector not in union:
+        key = tuple(vector)
+        if key not in seen:
+            seen.add(key)
             union.append(vector)
     return union
 
 # ==================== DATA LOADING AND INDEXING ====================
 
+_EMPTY = {}
+
+def _desc(contract_map: Dict, nid: int, default: str = 'Unknown') -> str:
+    """Description of contract nid, or default when there is no such contract"""
+    return (contract_map.get(nid) or _EMPTY).get('description', default)
+
+# (description, subject1, subject2) per contract ID for the last contract map seen:
+# (contract_map, triples)
+_triple_cache = (None, None)
+
+def _contract_triples(contract_map: Dict) -> Dict[int, Tuple[str, str, str]]:
+    """(description, subject1, subject2) of every complete contract, built once per map"""
+    global _triple_cache
+    if _triple_cache[0] is not contract_map:
+        triples = {cid: (c['description'], c['subject1'], c['subject2'])
+                   for cid, c in contract_map.items()
+                   if 'description' in c and 'subject1' in c and 'subject2' in c}
+        _triple_cache = (contract_map, triples)
+    return _triple_cache[1]
+
+def _ds12(contract_map: Dict, nid: int, default: str = 'Unknown') -> Tuple[str, str, str]:
+    """(description, subject1, subject2) of contract nid, as one ready-made tuple"""
+    triple = _contract_triples(contract_map).get(nid)
+    if triple is not None:
+        return triple
+    contract = contract_map.get(nid) or _EMPTY
+    return contract.get('description', default), contract.get('subject1', 'Unknown'), contract.get('subject2', 'Unknown')
+
+def _parse_id_list(id_list: str) -> List[int]:
+    """Parse a bracketed, comma-separated ID list such as "[1,-2,3]".
+    
+    Only one enclosing pair of brackets is removed; any other bracket, as in a
+    list split across arguments ("[1," "2]"), makes int() raise ValueError.
+    """
+    id_list = id_list.strip()
+    if id_list.startswith('[') and id_list.endswith(']'):
+        id_list = id_list[1:-1]
+    return [int(x) for x in id_list.split(',') if x.strip()]
+
 def load_kelsen_data(json_filename):
     """Load and index kelsen_data.json for contract lookups and relational queries."""
     if not os.path.isfile(json_filename):
@@ -151,12 +255,179 @@ def load_kelsen_data(json_filename):
             'data': matrix['data']
         }
     
-    return contract_map, subject1_index, subject2_index, clause_map, matrix_map
+    # Reverse lookups for the responsibility command: the first contract with
+    # each key, and the clauses mentioning each contract ID in any position
+    key_index = {}
+    for contract_id, contract in contract_map.items():
+        key_index.setdefault(contract['key'], contract_id)
+    
+    clause_by_contract = {}
+    for clause in clause_map.values():
+        for contract_id in dict.fromkeys((clause['condition_id1'], clause['condition_id2'], clause['consequence_id'])):
+            clause_by_contract.setdefault(contract_id, []).append(clause)
+    
+    # Exact (subject1, subject2, lowercased description) matches for the violates command
+    contract_triple_index = defaultdict(list)
+    for contract_id, contract in contract_map.items():
+        contract_triple_index[(contract['subject1'], contract['subject2'], contract['description'].lower())].append(contract_id)
+    
+    # Contracts naming each subject on either side, for path_subject and responsibility
+    subject_union_index = {
+        subject: frozenset(subject1_index.get(subject, []) + subject2_index.get(subject, []))
+        for subject in subject1_index.keys() | subject2_index.keys()
+    }
+    
+    return (contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+            key_index, clause_by_contract, dict(contract_triple_index), subject_union_index)
+
+def build_vector_index(vectors: List[List[int]]) -> Dict[str, Any]:
+    """Index vectors as bitmaps in both directions.
+    
+    'columns' maps each ID to a bitmap over vector positions (bit i set if
+    vectors[i] contains the ID); 'rows' holds each vector as a bitmap over IDs
+    (bit id set if the vector contains it), or None if an ID is negative or
+    ROW_BITMAP_MAX_ID or more, since every row is as wide as the largest ID.
+    """
+    # Set bits in fixed-size byte rows and convert once; OR-ing into growing
+    # ints would cost O(len(vectors)) per membership
+    row_bytes = (len(vectors) + 7) >> 3
+    columns = {}
+    for position, vector in enumerate(vectors):
+        byte_index = position >> 3
+        bit = 1 << (position & 7)
+        for vid in vector:
+            column = columns.get(vid)
+            if column is None:
+                column = columns[vid] = bytearray(row_bytes)
+            column[byte_index] |= bit
+    
+    rows = None
+    if not columns or (min(columns) >= 0 and max(columns) < ROW_BITMAP_MAX_ID):
+        rows = [reduce(or_, (1 << vid for vid in vector), 0) for vector in vectors]
+    
+    return {
+        'size': len(vectors),
+        'all': (1 << len(vectors)) - 1,
+        'columns': {vid: int.from_bytes(column, 'little') for vid, column in columns.items()},
+        'rows': rows
+    }
+
+def _bit_positions(mask: int):
+    """Yield the positions of the set bits of mask in increasing order"""
+    bits = bin(mask)[:1:-1]  # least significant bit first, without '0b'
+    position = bits.find('1')
+    while position != -1:
+        yield position
+        position = bits.find('1', position + 1)
+
+def _common_ids(rows: List[int], positions) -> int:
+    """AND of the ID bitmasks rows[p] for p in positions (at least one).
+    
+    Stops as soon as no ID is common to the vectors seen so far.
+    """
+    common = -1
+    for position in positions:
+        common &= rows[position]
+        if not common:
+            break
+    return common
+
+def _parse_vector_bytes(payload: bytes) -> List[int]:
+    """Parse the bytes between a vector line's brackets, e.g. b"1, 2, 3".
+    
+    A plain integer list is parsed entirely in C by the json decoder. Anything
+    else int() would take (leading zeros, '+5') goes through int() per entry,
+    and blank entries fall back to the tolerant parse.
+    """
+    try:
+        vector = json.loads(b'[' + payload + b']')
+        if set(map(type, vector)) <= {int}:
+            return vector
+    except ValueError:
+        pass
+    try:
+        return list(map(int, payload.split(b','))) if payload else []
+    except ValueError:
+        return [int(x) for x in payload.split(b',') if x.strip()]
+
+def _iter_file_vectors(f):
+    """Yield the parsed vector of each line of a binary vector file.
+    
+    Comment lines and lines without a bracketed payload are skipped; lines
+    whose payload does not parse are reported and skipped.
+    """
+    for line in f:
+        # Blank lines have no bracketed payload, so only comments need a check
+        if line.startswith(b'#'):
+            continue
+        # The payload runs from the first '[' to the next ']'
+        lb = line.find(b'[')
+        rb = line.find(b']', lb + 1) if lb >= 0 else -1
+        if rb < 0:
+            continue
+        try:
+            yield _parse_vector_bytes(line[lb + 1:rb])
+        except ValueError:
+            print(f"Skipping invalid vector: {line.strip().decode(errors='replace')}")
+
+def _count_vector_lines_grep(filename: str) -> Optional[int]:
+    """Count vector lines with grep's native line scan, or None if grep is unusable.
+    
+    grep -v counts the lines that are neither '#' comments nor blank; like
+    the Python scan it also counts a final line without a newline.
+    """
+    grep = shutil.which('grep')
+    if grep is None:
+        return None
+    try:
+        result = subprocess.run([grep, '-a', '-c', '-v', '-E', r'^(#|[[:space:]]*$)', '--', filename],
+                                capture_output=True, env=dict(os.environ, LC_ALL='C'))
+        # Exit status 1 only means no line was selected
+        if result.returncode in (0, 1):
+            return int(result.stdout)
+    except (OSError, ValueError):
+        pass
+    return None
+
+def count_vector_lines(filename: str) -> int:
+    """Count the non-blank, non-comment lines of a vector file.
+    
+    Reads raw bytes in large chunks: every newline ends a line, minus the
+    blank and '#' lines the skip patterns find, without decoding the file
+    or building a str per line. Each chunk starts on a line boundary, so
+    only its first line needs the anchored match; every later skipped line
+    is found from the newline before it.
+    
+    Files of EXTERNAL_COUNT_MIN_SIZE bytes or more are counted by grep when
+    it is available, falling back to the scan above if it is not or fails.
+    """
+    if os.path.getsize(filename) >= EXTERNAL_COUNT_MIN_SIZE:
+        count = _count_vector_lines_grep(filename)
+        if count is not None:
+            return count
+    
+    count = 0
+    carry = b''
+    with open(filename, 'rb', buffering=COUNT_CHUNK_SIZE) as f:
+        for chunk in iter(lambda: f.read(COUNT_CHUNK_SIZE), b''):
+            # Only whole lines are counted; the tail waits for the next chunk
+            end = chunk.rfind(b'\n') + 1
+            if not end:
+                carry += chunk
+                continue
+            data = carry + chunk[:end] if carry else chunk[:end]
+            carry = chunk[end:]
+            count += data.count(b'\n') - len(_SKIP_NEXT_LINE_RE.findall(data))
+            if _SKIP_LINE_RE.match(data):
+                count -= 1
+    if carry.strip() and not carry.startswith(b'#'):
+        count += 1
+    return count
 
 def load_vectors_from_file(filename: str, max_vectors: int = None) -> List[List[int]]:
     """Load all vectors from file into memory for team analysis"""
     if not os.path.isfile(filename):
-        print(f"Warning: Vector file not found at {filename}. Returning empty list.", file=sys.stderr)
+        log.warning("Warning: Vector file not found at %s. Returning empty list.", filename)
         return []
         
     vectors = []
@@ -180,8 +451,9 @@ def load_vectors_from_file(filename: str, max_vectors: int = None) -> List[List[
                     if current_zdd and current_vectors:
                         zdd_groups.append({
                             'metadata': current_zdd,
-                            'vectors': current_vectors.copy()
+                            'vectors': current_vectors
                         })
+                        current_vectors = []
                     
                     # Parse new ZDD metadata
                     parts = line.split(':')
@@ -208,13 +480,18 @@ def load_vectors_from_file(filename: str, max_vectors: int = None) -> List[List[
                 
                 continue
             
-            vector_match = re.search(r'\[(.*?)\]', line)
+            vector_match = _VEC_RE.search(line)
             if not vector_match:
                 continue
                 
             vector_str = vector_match.group(1)
             try:
-                vector = [int(x.strip()) for x in vector_str.split(',') if x.strip()]
+                try:
+                    # int() tolerates surrounding whitespace, so the common
+                    # case needs no per-element strip
+                    vector = Vector(map(int, vector_str.split(','))) if vector_str else Vector(())
+                except ValueError:
+                    vector = Vector(int(x.strip()) for x in vector_str.split(',') if x.strip())
                 vectors.append(vector)
                 
                 if current_zdd:
@@ -232,23 +509,42 @@ def load_vectors_from_file(filename: str, max_vectors: int = None) -> List[List[
                 'vectors': current_vectors
             })
     
-    # Store ZDD groups globally for ZDD-aware queries
-    global _zdd_groups
+    # Store ZDD groups and vectors globally for ZDD-aware and indexed queries;
+    # their bitmap indexes are built when a command first needs them
+    global _zdd_groups, _loaded_vectors, _vector_index
     _zdd_groups = zdd_groups
+    _loaded_vectors = vectors
+    _vector_index = None
+    _zdd_consequences_cached.cache_clear()
     
     return vectors
 
+def _loaded_vector_index() -> Dict[str, Any]:
+    """The bitmap index over the vectors last loaded, built on first use"""
+    global _vector_index
+    if _vector_index is None:
+        _vector_index = build_vector_index(_loaded_vectors)
+    return _vector_index
+
 # ==================== VECTOR QUERY FUNCTIONS ====================
 
-def query_vectors(vectors_list: List[List[int]], required_elements, forbidden_elements, contract_map, allowed_ids=None, max_print=MAX_VECTORS_TO_PRINT):
-    """Query a list of vectors, returning matching vectors and necessary IDs."""
+def query_vectors(vectors_list: List[List[int]], required_elements, forbidden_elements, contract_map, allowed_ids=None, max_print=MAX_VECTORS_TO_PRINT, index=None):
+    """Query a list of vectors, returning matching vectors and necessary IDs.
+    
+    When index (from build_vector_index over vectors_list) is given, the filter
+    runs as AND/AND-NOT/OR over its per-ID bitmaps instead of scanning vectors.
+    """
+    if index is not None:
+        return _query_vector_index(vectors_list, index, required_elements, forbidden_elements, allowed_ids, max_print)
+    
     found_vectors = []
     
-    for vector in vectors_list:
-        satisfies_subject = allowed_ids is None or any(vid in allowed_ids for vid in vector)
+    for vector, vector_ids in zip(vectors_list, _freeze_team(vectors_list)):
+        # One C-level probe of the vector's hashed IDs against allowed_ids
+        satisfies_subject = allowed_ids is None or not vector_ids.isdisjoint(allowed_ids)
         if (satisfies_subject and
-            all(elem in vector for elem in required_elements) and
-            not any(elem in vector for elem in forbidden_elements)):
+            all(elem in vector_ids for elem in required_elements) and
+            not any(elem in vector_ids for elem in forbidden_elements)):
             found_vectors.append(vector)
         
         if len(found_vectors) >= max_print:
@@ -262,6 +558,43 @@ def query_vectors(vectors_list: List[List[int]], required_elements, forbidden_el
     
     return found_vectors, necessary_ids
 
+def _query_vector_index(vectors_list, index, required_elements, forbidden_elements, allowed_ids, max_print):
+    """Bitmap implementation of query_vectors over a build_vector_index() index"""
+    columns = index['columns']
+    
+    # Start from the rarest required ID's column, like intersecting posting
+    # lists, and stop as soon as no candidate vector is left
+    required_columns = sorted((columns.get(elem, 0) for elem in required_elements), key=int.bit_count)
+    mask = index['all']
+    for column in required_columns:
+        mask &= column
+        if not mask:
+            break
+    if mask and forbidden_elements:
+        # One AND-NOT against the union of the forbidden columns
+        mask &= ~reduce(or_, (columns.get(elem, 0) for elem in forbidden_elements))
+    if mask and allowed_ids is not None:
+        allowed_mask = 0
+        for vid in allowed_ids:
+            allowed_mask |= columns.get(vid, 0)
+        mask &= allowed_mask
+    
+    positions = list(islice(_bit_positions(mask), max_print))
+    found_vectors = [vectors_list[position] for position in positions]
+    
+    necessary_ids = set()
+    if found_vectors:
+        rows = index['rows']
+        if rows is not None:
+            # AND the matching vectors' ID bitmaps, then read off the common IDs
+            necessary_ids = set(_bit_positions(_common_ids(rows, positions)))
+        else:
+            # Only vectors within the print limit count, as in the scanning path
+            mask &= (1 << (positions[-1] + 1)) - 1
+            necessary_ids = {vid for vid in found_vectors[0] if columns[vid] & mask == mask}
+    
+    return found_vectors, necessary_ids
+
 # ==================== ZDD-AWARE QUERY FUNCTIONS ====================
 
 def query_vectors_zdd_aware(required_elements, forbidden_elements, contract_map, allowed_ids=None, max_print=MAX_VECTORS_TO_PRINT):
@@ -272,80 +605,22 @@ def query_vectors_zdd_aware(required_elements, forbidden_elements, contract_map,
         # Fallback to regular query if no ZDD groups available
         return query_vectors([], required_elements, forbidden_elements, contract_map, allowed_ids, max_print)
     
-    zdd_results = []
-    total_found_vectors = []
+    if not required_elements:
+        return _query_zdd_aware_forbidden_only(forbidden_elements, allowed_ids)
     
-    for zdd_group in _zdd_groups:
-        zdd_vectors = zdd_group['vectors']
-        zdd_metadata = zdd_group['metadata']
-        
-        # Analyze ZDD domain
-        zdd_domain = analyze_zdd_domain(zdd_vectors, zdd_metadata)
-        
-        # Check if required elements are applicable to this ZDD
-        applicable_required = []
-        non_applicable_required = []
-        
-        for elem in required_elements:
-            if is_integer_applicable_to_zdd(elem, zdd_domain, zdd_metadata):
-                applicable_required.append(elem)
-            else:
-                non_applicable_required.append(elem)
-        
-        # Apply the same query logic to this ZDD's vectors
-        found_vectors = []
-        for vector in zdd_vectors:
-            satisfies_subject = allowed_ids is None or any(vid in allowed_ids for vid in vector)
-            if (satisfies_subject and
-                all(elem in vector for elem in applicable_required) and
-                not any(elem in vector for elem in forbidden_elements)):
-                found_vectors.append(vector)
-        
-        # Calculate necessary IDs for this ZDD
-        necessary_ids = set()
-        if found_vectors:
-            necessary_ids = set(found_vectors[0])
-            for vector in found_vectors[1:]:
-                necessary_ids &= set(vector)
-        
-        # Determine status based on applicability and results
-        if non_applicable_required:
-            status = "NOT_APPLICABLE"
-            status_reason = f"Required elements {non_applicable_required} not applicable to this ZDD domain"
-        elif found_vectors:
-            status = "FULFILLED"
-            status_reason = f"Found {len(found_vectors)} matching vectors"
-        else:
-            status = "VIOLATED"
-            status_reason = f"Required elements {applicable_required} missing from applicable ZDD"
-        
-        # Store results for this ZDD
-        zdd_result = {
-            'zdd_name': zdd_metadata['name'],
-            'zdd_magic': zdd_metadata['magic'],
-            'zdd_arrays': zdd_metadata['arrays'],
-            'zdd_domain': zdd_domain,
-            'found_vectors': found_vectors,
-            'necessary_ids': necessary_ids,
-            'vector_count': len(found_vectors),
-            'status': status,
-            'status_reason': status_reason,
-            'applicable_required': applicable_required,
-            'non_applicable_required': non_applicable_required
-        }
-        
-        zdd_results.append(zdd_result)
-        total_found_vectors.extend(found_vectors)
+    # Each ZDD is queried independently; only the reduction below is shared
+    zdd_results = [_query_one_zdd(zdd_group, required_elements, forbidden_elements, allowed_ids)
+                   for zdd_group in _zdd_groups]
+    total_found_vectors = []
+    for zdd_result in zdd_results:
+        total_found_vectors.extend(zdd_result['found_vectors'])
     
     # Calculate overall necessary IDs - find IDs that are necessary in ALL applicable ZDDs
     overall_necessary_ids = set()
     
     # For fulfillment analysis: look at ZDDs where the required elements are present
-    if required_elements:
-        applicable_zdds = [z for z in zdd_results if z['status'] == 'FULFILLED']
-    # For violation analysis: look at ZDDs where forbidden elements are absent but vectors exist
-    else:
-        applicable_zdds = [z for z in zdd_results if z['status'] == 'VIOLATED' and z['vector_count'] > 0]
+    # (violation analysis, with no required elements, is handled by the forbidden-only path)
+    applicable_zdds = [z for z in zdd_results if z['status'] == 'FULFILLED']
     
     if applicable_zdds:
         # Start with the necessary IDs from the first applicable ZDD
@@ -357,14 +632,166 @@ def query_vectors_zdd_aware(required_elements, forbidden_elements, contract_map,
     
     return zdd_results, total_found_vectors, overall_necessary_ids
 
-def split_vectors(vectors_list: List[List[int]], id1, id2, contract_map):
-    """Split vectors based on presence of id1 or id2, returning sets Y (id1) and Z (id2)."""
+@lru_cache(maxsize=1024)
+def _zdd_consequences_cached(required: Tuple[int, ...], forbidden: Tuple[int, ...]):
+    """Summary of query_vectors_zdd_aware over the loaded ZDD groups, memoized per session.
+    
+    Returns (sections, found_count, necessary_ids), where each section keeps
+    only the name, status, vector count and necessary IDs of one ZDD result;
+    the matching vectors themselves are not cached. The results are shared
+    between callers and must not be mutated; the cache is cleared whenever
+    load_vectors_from_file replaces the ZDD groups. The contract map only
+    reaches the no-ZDD fallback, which never reads it.
+    """
+    zdd_results, found_vectors, necessary_ids = query_vectors_zdd_aware(list(required), list(forbidden), {})
+    sections = tuple(
+        {
+            'zdd_name': zdd_result['zdd_name'],
+            'status': zdd_result['status'],
+            'vector_count': zdd_result['vector_count'],
+            'necessary_ids': frozenset(zdd_result['necessary_ids'])
+        }
+        for zdd_result in zdd_results
+    )
+    return sections, len(found_vectors), frozenset(necessary_ids)
+
+def _zdd_group_domain(zdd_group):
+    """Analyze a ZDD group's domain once; it only depends on the vectors."""
+    zdd_domain = zdd_group.get('domain')
+    if zdd_domain is None:
+        zdd_domain = zdd_group['domain'] = analyze_zdd_domain(zdd_group['vectors'], zdd_group['metadata'])
+    return zdd_domain
+
+def _zdd_group_index(zdd_group):
+    """Build a ZDD group's bitmap index once, the first time it is queried."""
+    index = zdd_group.get('index')
+    if index is None:
+        index = zdd_group['index'] = build_vector_index(zdd_group['vectors'])
+    return index
+
+def _zdd_result(zdd_group, found_vectors, necessary_ids, status, status_reason,
+                applicable_required, non_applicable_required):
+    """Assemble the per-ZDD result dict reported by the ZDD-aware query."""
+    zdd_metadata = zdd_group['metadata']
+    return {
+        'zdd_name': zdd_metadata['name'],
+        'zdd_magic': zdd_metadata['magic'],
+        'zdd_arrays': zdd_metadata['arrays'],
+        'zdd_domain': _zdd_group_domain(zdd_group),
+        'found_vectors': found_vectors,
+        'necessary_ids': necessary_ids,
+        'vector_count': len(found_vectors),
+        'status': status,
+        'status_reason': status_reason,
+        'applicable_required': applicable_required,
+        'non_applicable_required': non_applicable_required
+    }
+
+def _query_one_zdd(zdd_group, required_elements, forbidden_elements, allowed_ids):
+    """Query a single ZDD group for the required/forbidden elements."""
+    zdd_vectors = zdd_group['vectors']
+    zdd_metadata = zdd_group['metadata']
+    zdd_domain = _zdd_group_domain(zdd_group)
+    
+    # Check if required elements are applicable to this ZDD
+    applicable_required = []
+    non_applicable_required = []
+    
+    for elem in required_elements:
+        if is_integer_applicable_to_zdd(elem, zdd_domain, zdd_metadata):
+            applicable_required.append(elem)
+        else:
+            non_applicable_required.append(elem)
+    
+    # Apply the same query logic to this ZDD's vectors, through its bitmap index
+    found_vectors, necessary_ids = _query_vector_index(
+        zdd_vectors, _zdd_group_index(zdd_group), applicable_required, forbidden_elements,
+        allowed_ids, len(zdd_vectors))
+    
+    # Determine status based on applicability and results
+    if non_applicable_required:
+        status = "NOT_APPLICABLE"
+        status_reason = f"Required elements {non_applicable_required} not applicable to this ZDD domain"
+    elif found_vectors:
+        status = "FULFILLED"
+        status_reason = f"Found {len(found_vectors)} matching vectors"
+    else:
+        status = "VIOLATED"
+        status_reason = f"Required elements {applicable_required} missing from applicable ZDD"
+    
+    return _zdd_result(zdd_group, found_vectors, necessary_ids, status, status_reason,
+                       applicable_required, non_applicable_required)
+
+def _query_one_zdd_forbidden_only(zdd_group, forbidden_elements, allowed_ids):
+    """Mask a single ZDD group by the forbidden (and allowed) IDs."""
+    zdd_vectors = zdd_group['vectors']
+    found_vectors, necessary_ids = _query_vector_index(
+        zdd_vectors, _zdd_group_index(zdd_group), [], forbidden_elements,
+        allowed_ids, len(zdd_vectors))
+    
+    if found_vectors:
+        status = "FULFILLED"
+        status_reason = f"Found {len(found_vectors)} matching vectors"
+    else:
+        status = "VIOLATED"
+        status_reason = "Required elements [] missing from applicable ZDD"
+    
+    return _zdd_result(zdd_group, found_vectors, necessary_ids, status, status_reason, [], [])
+
+def _query_zdd_aware_forbidden_only(forbidden_elements, allowed_ids=None):
+    """ZDD-aware query with no required elements.
+    
+    Nothing needs an applicability check, so each ZDD is just masked by the
+    forbidden (and allowed) IDs through its bitmap index.
+    """
+    zdd_results = [_query_one_zdd_forbidden_only(zdd_group, forbidden_elements, allowed_ids)
+                   for zdd_group in _zdd_groups]
+    total_found_vectors = []
+    for zdd_result in zdd_results:
+        total_found_vectors.extend(zdd_result['found_vectors'])
+    
+    # Violation analysis only counts VIOLATED ZDDs that still have vectors,
+    # and a VIOLATED ZDD here never has any, so nothing is necessary overall
+    return zdd_results, total_found_vectors, set()
+
+def split_vectors(vectors_list: List[List[int]], id1, id2, contract_map, index=None):
+    """Split vectors based on presence of id1 or id2, returning Y (id1) and Z (id2)
+    as sorted ID lists.
+    
+    With an index over vectors_list, membership comes from the id1/id2 columns
+    and Y/Z are the set bits of the OR of those vectors' ID bitmasks, which
+    come out in increasing order (or the IDs whose columns intersect them).
+    """
+    if index is not None:
+        columns = index['columns']
+        has_id1 = columns.get(id1, 0)
+        has_id2 = columns.get(id2, 0)
+        
+        missing = index['all'] & ~(has_id1 | has_id2)
+        if missing:
+            vector = vectors_list[next(_bit_positions(missing))]
+            print(f"Split fails: both actions interact with certainty.")
+            print(f"Found vector without ID {id1} or ID {id2}: {vector}")
+            return None, None, False
+        
+        rows = index['rows']
+        if rows is not None:
+            Y = list(_bit_positions(reduce(or_, map(rows.__getitem__, _bit_positions(has_id1)), 0)))
+            Z = list(_bit_positions(reduce(or_, map(rows.__getitem__, _bit_positions(has_id2)), 0)))
+        else:
+            Y = sorted(vid for vid, column in columns.items() if column & has_id1)
+            Z = sorted(vid for vid, column in columns.items() if column & has_id2)
+        
+        print(f"Split succeeded: both actions interact with uncertainty.")
+        print(f"Processed {len(vectors_list):,} vectors.")
+        return Y, Z, True
+    
     Y = set()  # IDs from vectors containing id1
     Z = set()  # IDs from vectors containing id2
     
-    for vector in vectors_list:
-        id1_present = id1 in vector
-        id2_present = id2 in vector
+    for vector, vector_ids in zip(vectors_list, _freeze_team(vectors_list)):
+        id1_present = id1 in vector_ids
+        id2_present = id2 in vector_ids
         
         if not id1_present and not id2_present:
             print(f"Split fails: both actions interact with certainty.")
@@ -378,17 +805,41 @@ def split_vectors(vectors_list: List[List[int]], id1, id2, contract_map):
     
     print(f"Split succeeded: both actions interact with uncertainty.")
     print(f"Processed {len(vectors_list):,} vectors.")
-    return Y, Z, True
+    return sorted(Y), sorted(Z), True
+
+def _permissive_counts(index: Dict[str, Any], id1: int, id2: int) -> Dict[Tuple[bool, bool], int]:
+    """Nonzero (id1_present, id2_present) -> vector count, from popcounts of the two columns"""
+    columns = index['columns']
+    has_id1 = columns.get(id1, 0)
+    has_id2 = columns.get(id2, 0)
+    
+    both = (has_id1 & has_id2).bit_count()
+    only_id1 = has_id1.bit_count() - both
+    only_id2 = has_id2.bit_count() - both
+    counts = {
+        (False, False): index['size'] - both - only_id1 - only_id2,
+        (False, True): only_id2,
+        (True, False): only_id1,
+        (True, True): both
+    }
+    return {combination: count for combination, count in counts.items() if count}
 
-def permissive_vectors(vectors_list: List[List[int]], id1, id2, contract_map):
-    """Check if id1 and id2 are independent by observing all four presence/absence combinations."""
+def permissive_vectors(vectors_list: List[List[int]], id1, id2, contract_map, index=None):
+    """Check if id1 and id2 are independent by observing all four presence/absence combinations.
+    
+    With an index over vectors_list, the four counts are popcounts of the
+    id1/id2 columns and their overlap.
+    """
     # Track combinations: (id1_present, id2_present) -> count
     combinations = defaultdict(int)
     
-    for vector in vectors_list:
-        id1_present = id1 in vector
-        id2_present = id2 in vector
-        combinations[(id1_present, id2_present)] += 1
+    if index is not None:
+        combinations.update(_permissive_counts(index, id1, id2))
+    else:
+        for vector_ids in _freeze_team(vectors_list):
+            id1_present = id1 in vector_ids
+            id2_present = id2 in vector_ids
+            combinations[(id1_present, id2_present)] += 1
     
     print(f"Processed {len(vectors_list):,} vectors.")
     
@@ -425,14 +876,12 @@ def permissive_vectors(vectors_list: List[List[int]], id1, id2, contract_map):
 def analyze_zdd_domain(zdd_vectors: List[List[int]], zdd_metadata: Dict[str, Any]) -> Dict[str, Any]:
     """Analyze the domain of a ZDD by examining its integer ranges"""
     if not zdd_vectors:
-        return {'min_id': None, 'max_id': None, 'id_range': set(), 'domain_type': 'empty'}
+        return {'min_id': None, 'max_id': None, 'id_range': frozenset(), 'domain_type': 'empty'}
     
-    all_ids = set()
-    for vector in zdd_vectors:
-        all_ids.update(vector)
+    all_ids = frozenset().union(*zdd_vectors)
     
     if not all_ids:
-        return {'min_id': None, 'max_id': None, 'id_range': set(), 'domain_type': 'empty'}
+        return {'min_id': None, 'max_id': None, 'id_range': frozenset(), 'domain_type': 'empty'}
     
     min_id = min(all_ids)
     max_id = max(all_ids)
@@ -481,11 +930,160 @@ def is_integer_applicable_to_zdd(integer: int, zdd_domain: Dict[str, Any], zdd_m
 
 # ==================== TEAM SEMANTICS ANALYSIS ====================
 
+def _variable_statistics(frozen_team: List[FrozenSet[int]]) -> Tuple[Dict[int, int], Dict[int, int], Dict[int, int]]:
+    """Per-variable support count, smallest and largest containing vector, in one pass"""
+    support_counts = {}
+    min_sizes = {}
+    max_sizes = {}
+    
+    for vector in frozen_team:
+        size = len(vector)
+        for var in vector:
+            if var in support_counts:
+                support_counts[var] += 1
+                if size < min_sizes[var]:
+                    min_sizes[var] = size
+                if size > max_sizes[var]:
+                    max_sizes[var] = size
+            else:
+                support_counts[var] = 1
+                min_sizes[var] = size
+                max_sizes[var] = size
+    
+    return support_counts, min_sizes, max_sizes
+
+def _dependency_all_vars(frozen_team: List[FrozenSet[int]]) -> Dict[int, int]:
+    """dependency_measure for every variable of the team in one pass.
+    
+    Removing X only merges two distinct vectors when one is the other plus X,
+    so dependency(X) is the number of duplicate vectors plus the number of
+    distinct vectors A containing X for which A - {X} is also in the team.
+    """
+    distinct = set(frozen_team)
+    duplicates = len(frozen_team) - len(distinct)
+    
+    # One singleton per variable for this call, rather than building {var}
+    # for every (vector, var) pair
+    all_vars = set().union(*distinct)
+    singletons = {var: frozenset((var,)) for var in all_vars}
+    
+    dependency = dict.fromkeys(all_vars, duplicates)
+    for vector in distinct:
+        for var in vector:
+            if vector - singletons[var] in distinct:
+                dependency[var] += 1
+    
+    return dependency
+
+# Results of team_semantic_analysis / generate_argument_strategy, keyed by a
+# fingerprint of the teams. Entries are (contract_map, teams, result, cost): a
+# hit also requires the same contract map object and teams equal to the stored
+# ones, so fingerprint collisions miss. Results are shared rather than copied;
+# each caller gets its own top-level dict and must not mutate nested values
+_analysis_cache = OrderedDict()
+_analysis_cache_cost = 0
+
+def _team_fingerprint(team: List[List[int]]) -> Tuple[int, int]:
+    """Compact key of a team: its length and a hash of its vectors in order"""
+    return len(team), hash(tuple(map(tuple, team)))
+
+def _cache_lookup(key, contract_map: Dict, teams: Tuple[List[List[int]], ...]):
+    """Return a cached analysis result for exactly these teams, or None on a miss"""
+    entry = _analysis_cache.get(key)
+    if entry is None or entry[0] is not contract_map or entry[1] != teams:
+        return None
+    _analysis_cache.move_to_end(key)
+    return dict(entry[2])
+
+def _cache_store(key, contract_map: Dict, teams: Tuple[List[List[int]], ...], result):
+    """Cache an analysis result, evicting least recently used entries until the
+    vectors held across all entries fit in ANALYSIS_CACHE_BUDGET"""
+    global _analysis_cache_cost
+    cost = 1 + sum(map(len, teams))
+    if cost > ANALYSIS_CACHE_BUDGET:
+        return
+    old = _analysis_cache.pop(key, None)
+    if old is not None:
+        _analysis_cache_cost -= old[3]
+    _analysis_cache[key] = (contract_map, tuple(map(list, teams)), dict(result), cost)
+    _analysis_cache_cost += cost
+    while _analysis_cache_cost > ANALYSIS_CACHE_BUDGET:
+        _, evicted = _analysis_cache.popitem(last=False)
+        _analysis_cache_cost -= evicted[3]
+
+# Dense description list for the last contract map seen: (contract_map, descriptions)
+_description_cache = (None, None)
+
+def description_array(contract_map: Dict) -> Optional[List[str]]:
+    """Contract descriptions indexed by ID, 'Unknown' where no contract exists.
+    
+    Built once per contract map. Returns None when the IDs are negative or too
+    sparse for a dense list; callers then fall back to the map itself.
+    """
+    global _description_cache
+    if _description_cache[0] is contract_map:
+        return _description_cache[1]
+    
+    descriptions = None
+    size = _dense_id_size(contract_map)
+    if size is not None:
+        descriptions = ['Unknown'] * size
+        for contract_id, contract in contract_map.items():
+            descriptions[contract_id] = contract.get('description', 'Unknown')
+    
+    _description_cache = (contract_map, descriptions)
+    return descriptions
+
+def _dense_id_size(contract_map: Dict) -> Optional[int]:
+    """Length of a list indexed by contract ID, or None if the IDs are negative
+    or too sparse for one"""
+    if contract_map and min(contract_map) >= 0:
+        size = max(contract_map) + 1
+        if size <= 4 * len(contract_map) + 1024:
+            return size
+    return None
+
+# Preformatted "ID n: 'description'" labels for the last contract map seen:
+# (contract_map, labels)
+_label_cache = (None, None)
+
+def vector_labels(contract_map: Dict) -> Optional[List[str]]:
+    """The sample command's per-ID labels, indexed by ID, built once per map.
+    
+    IDs without a contract get the 'Unknown contract' label. Returns None
+    when the IDs are not dense enough for a list.
+    """
+    global _label_cache
+    if _label_cache[0] is not contract_map:
+        labels = None
+        size = _dense_id_size(contract_map)
+        if size is not None:
+            labels = [f"ID {vid}: 'Unknown contract'" for vid in range(size)]
+            for contract_id, contract in contract_map.items():
+                if contract:
+                    labels[contract_id] = f"ID {contract_id}: '{contract['description']}'"
+        _label_cache = (contract_map, labels)
+    return _label_cache[1]
+
+def _describe(descriptions: Optional[List[str]], contract_map: Dict, var: int) -> str:
+    """Description of var from description_array, or from contract_map without one"""
+    if descriptions is not None:
+        return descriptions[var] if 0 <= var < len(descriptions) else 'Unknown'
+    return _desc(contract_map, var)
+
 def team_semantic_analysis(team: List[List[int]], contract_map: Dict, team_name: str = "Team") -> Dict:
-    """Comprehensive team semantic analysis"""
+    """Comprehensive team semantic analysis (memoized on the team's content)"""
     if not team:
         return {"error": "Empty team"}
     
+    cache_key = ('analysis', _team_fingerprint(team), team_name)
+    cached = _cache_lookup(cache_key, contract_map, (team,))
+    if cached is not None:
+        return cached
+    
+    # Hash every vector once; all per-variable measures run on this view
+    frozen_team = _freeze_team(team)
+    
     # Get all variables in the team
     all_vars = set()
     for vector in team:
@@ -496,34 +1094,62 @@ def team_semantic_analysis(team: List[List[int]], contract_map: Dict, team_name:
         "team_name": team_name,
         "team_size": len(team),
         "total_variables": len(all_vars),
-        "core_elements": core_elements(team),
+        "core_elements": core_elements(frozen_team),
         "variable_analysis": {}
     }
     
+    # Support, fragility, robustness and dependency for every variable in one pass each
+    support_counts, min_sizes, max_sizes = _variable_statistics(frozen_team)
+    dependencies = _dependency_all_vars(frozen_team)
+    team_size = len(team)
+    
+    # A variable is essential exactly when it is a core element
+    core_set = frozenset(analysis["core_elements"])
+    descriptions = description_array(contract_map)
+    
     # Analyze each variable
     for var in all_vars:
+        var_fragility = min_sizes[var]
+        var_dependency = dependencies[var]
+        var_leverage = var_dependency / team_size
         var_analysis = {
             "id": var,
-            "description": contract_map.get(var, {}).get('description', 'Unknown'),
-            "support": universal_support(var, team),
-            "fragility": fragility(var, team),
-            "dependency": dependency_measure(var, team),
-            "leverage": leverage(var, team),
-            "criticality": criticality(var, team),
-            "robustness": robustness(var, team),
-            "essential": essential_variable(var, team)
+            "description": _describe(descriptions, contract_map, var),
+            "support": support_counts[var] / team_size,
+            "fragility": var_fragility,
+            "dependency": var_dependency,
+            "leverage": var_leverage,
+            "criticality": var_fragility * var_leverage,
+            "robustness": max_sizes[var],
+            "essential": var in core_set
         }
         analysis["variable_analysis"][var] = var_analysis
     
+    _cache_store(cache_key, contract_map, (team,), analysis)
     return analysis
 
+def _analyze_two_teams(team1: List[List[int]], name1: str, team2: List[List[int]], name2: str,
+                       contract_map: Dict) -> Tuple[Dict, Dict]:
+    """team_semantic_analysis of two teams; when both have the same vectors
+    the per-variable pass runs once and only the team name differs"""
+    analysis1 = team_semantic_analysis(team1, contract_map, name1)
+    if team2 and team2 == team1:
+        analysis2 = dict(analysis1)
+        analysis2["team_name"] = name2
+        return analysis1, analysis2
+    return analysis1, team_semantic_analysis(team2, contract_map, name2)
+
 def generate_argument_strategy(plaintiff_team: List[List[int]], defendant_team: List[List[int]], 
                              contract_map: Dict) -> Dict:
-    """Generate legal argument strategy using team semantics"""
+    """Generate legal argument strategy using team semantics (memoized on both teams' content)"""
+    cache_key = ('strategy', _team_fingerprint(plaintiff_team), _team_fingerprint(defendant_team))
+    cached = _cache_lookup(cache_key, contract_map, (plaintiff_team, defendant_team))
+    if cached is not None:
+        return cached
     
     # Analyze both teams
-    plaintiff_analysis = team_semantic_analysis(plaintiff_team, contract_map, "Plaintiff")
-    defendant_analysis = team_semantic_analysis(defendant_team, contract_map, "Defendant")
+    plaintiff_analysis, defendant_analysis = _analyze_two_teams(
+        plaintiff_team, "Plaintiff", defendant_team, "Defendant", contract_map)
     
     # Find attack targets (defendant vulnerabilities)
     attack_targets = []
@@ -539,16 +1165,13 @@ def generate_argument_strategy(plaintiff_team: List[List[int]], defendant_team:
                     "priority": var_data["criticality"] + (var_data["dependency"] * 0.5)
                 })
     
-    attack_targets.sort(key=lambda x: x["priority"], reverse=True)
+    attack_targets = heapq.nlargest(5, attack_targets, key=lambda x: x["priority"])  # Top 5 targets
     
     # Find what plaintiff must establish
     must_establish = plaintiff_analysis.get("core_elements", [])
     
-    # Find contested ground
-    contested = attack_surface(plaintiff_team, defendant_team)
-    
-    # Find defense positions
-    defense_positions = defense_space(plaintiff_team, defendant_team)
+    # Find contested ground and defense positions
+    contested, defense_positions = partition_team(plaintiff_team, defendant_team)
     
     # Calculate strategic metrics
     plaintiff_vulnerabilities = []
@@ -562,14 +1185,14 @@ def generate_argument_strategy(plaintiff_team: List[List[int]], defendant_team:
                     "dependency": var_data["dependency"]
                 })
     
-    plaintiff_vulnerabilities.sort(key=lambda x: x["criticality"], reverse=True)
+    plaintiff_vulnerabilities = heapq.nlargest(3, plaintiff_vulnerabilities, key=lambda x: x["criticality"])  # Top 3 vulnerabilities
     
     strategy = {
         "plaintiff_analysis": plaintiff_analysis,
         "defendant_analysis": defendant_analysis,
-        "attack_targets": attack_targets[:5],  # Top 5 targets
+        "attack_targets": attack_targets,
         "must_establish": must_establish,
-        "plaintiff_vulnerabilities": plaintiff_vulnerabilities[:3],  # Top 3 vulnerabilities
+        "plaintiff_vulnerabilities": plaintiff_vulnerabilities,
         "contested_ground": len(contested),
         "contested_vectors": contested,
         "defense_positions": len(defense_positions),
@@ -578,19 +1201,36 @@ def generate_argument_strategy(plaintiff_team: List[List[int]], defendant_team:
                               "DEFENDANT" if len(defendant_team) > len(plaintiff_team) else "BALANCED"
     }
     
+    _cache_store(cache_key, contract_map, (plaintiff_team, defendant_team), strategy)
     return strategy
 
-def simulate_attack_impact(team: List[List[int]], target_variable: int, contract_map: Dict) -> Dict:
-    """Simulate the impact of successfully attacking a target variable"""
+def simulate_attack_impact(team: List[List[int]], target_variable: int, contract_map: Dict, index=None) -> Dict:
+    """Simulate the impact of successfully attacking a target variable
+    
+    With an index over team, the surviving vectors are one AND-NOT on the
+    target's column and the new core is the AND of their ID bitmasks.
+    """
     original_size = len(team)
     
     # Remove vectors containing the target variable
-    modified_team = [vector for vector in team if target_variable not in vector]
-    new_size = len(modified_team)
+    new_core = None
+    if index is not None:
+        keep_mask = index['all'] & ~index['columns'].get(target_variable, 0)
+        new_size = keep_mask.bit_count()
+        modified_team = [team[position] for position in islice(_bit_positions(keep_mask), 5)]
+        if new_size > 0 and index['rows'] is not None:
+            rows = index['rows']
+            new_core = list(_bit_positions(_common_ids(rows, _bit_positions(keep_mask))))
+        elif new_size > 0:
+            new_core = core_elements([team[position] for position in _bit_positions(keep_mask)])
+    else:
+        modified_team = [vector for vector, vector_ids in zip(team, _freeze_team(team))
+                         if target_variable not in vector_ids]
+        new_size = len(modified_team)
     
     impact = {
         "target_variable": target_variable,
-        "target_description": contract_map.get(target_variable, {}).get('description', 'Unknown'),
+        "target_description": _describe(description_array(contract_map), contract_map, target_variable),
         "original_team_size": original_size,
         "modified_team_size": new_size,
         "vectors_eliminated": original_size - new_size,
@@ -600,821 +1240,908 @@ def simulate_attack_impact(team: List[List[int]], target_variable: int, contract
     }
     
     if new_size > 0:
-        impact["new_core"] = core_elements(modified_team)
+        impact["new_core"] = new_core if new_core is not None else core_elements(modified_team)
     
     return impact
 
 # ==================== ENHANCED COMMAND PROCESSING ====================
 
-def process_team_semantic_command(parts, all_vectors, contract_map):
-    """Process team semantic analysis commands"""
-    cmd = parts[0].lower()
+def _cmd_analyze_team(parts, all_vectors, contract_map):
+    """analyze_team <required> [forbidden]: comprehensive team semantic analysis"""
+    if len(parts) < 2:
+        print("Error: Missing team specification")
+        print("Usage: analyze_team <required_elements> [forbidden_elements]")
+        print("Example: analyze_team [1,2,3] [-4,-5]")
+        return
     
-    if cmd == 'analyze_team':
-        if len(parts) < 2:
-            print("Error: Missing team specification")
-            print("Usage: analyze_team <required_elements> [forbidden_elements]")
-            print("Example: analyze_team [1,2,3] [-4,-5]")
-            return
+    try:
+        # Parse required elements
+        required = _parse_id_list(parts[1])
         
-        try:
-            # Parse required elements
-            required_str = parts[1].strip()
-            if required_str.startswith('[') and required_str.endswith(']'):
-                required_str = required_str[1:-1]
-            required = [int(x.strip()) for x in required_str.split(',') if x.strip()]
-            
-            # Parse forbidden elements if provided
-            forbidden = []
-            if len(parts) > 2:
-                forbidden_str = parts[2].strip()
-                if forbidden_str.startswith('[') and forbidden_str.endswith(']'):
-                    forbidden_str = forbidden_str[1:-1]
-                forbidden = [abs(int(x.strip())) for x in forbidden_str.split(',') if x.strip()]
-            
-            # Get matching vectors
-            found_vectors, _ = query_vectors(all_vectors, required, forbidden, contract_map)
-            
-            if not found_vectors:
-                print("No vectors found matching the criteria")
-                return
-            
-            # Perform team semantic analysis
-            analysis = team_semantic_analysis(found_vectors, contract_map, "Query Team")
-            
-            print(f"\n=== TEAM SEMANTIC ANALYSIS ===")
-            print(f"Team: {analysis['team_name']}")
-            print(f"Size: {analysis['team_size']} vectors")
-            print(f"Variables: {analysis['total_variables']}")
-            
-            core = analysis['core_elements']
-            if core:
-                print(f"\nCORE ELEMENTS (required in ALL vectors):")
-                for var_id in core:
-                    desc = contract_map.get(var_id, {}).get('description', 'Unknown')
-                    print(f"  ID {var_id}: {desc}")
-            else:
-                print(f"\nNo core elements found")
-            
-            print(f"\nVARIABLE ANALYSIS:")
-            var_analysis = analysis['variable_analysis']
-            sorted_vars = sorted(var_analysis.items(), key=lambda x: x[1]['criticality'], reverse=True)
-            
-            for var_id, data in sorted_vars[:10]:  # Top 10 by criticality
-                print(f"  ID {var_id}: {data['description']}")
-                print(f"    Support: {data['support']:.3f} | Fragility: {data['fragility']} | "
-                      f"Criticality: {data['criticality']:.3f}")
-                print(f"    Dependency: {data['dependency']} | Leverage: {data['leverage']:.3f} | "
-                      f"Essential: {data['essential']}")
-                
-        except ValueError as e:
-            print(f"Error parsing elements: {e}")
-            
-    elif cmd == 'compare_teams':
-        if len(parts) < 3:
-            print("Error: Missing team specifications")
-            print("Usage: compare_teams <team1_elements> <team2_elements>")
-            print("Example: compare_teams [1,2,3] [4,5,6]")
-            return
+        # Parse forbidden elements if provided
+        forbidden = []
+        if len(parts) > 2:
+            forbidden = [abs(x) for x in _parse_id_list(parts[2])]
         
-        try:
-            # Parse team 1
-            team1_str = parts[1].strip()
-            if team1_str.startswith('[') and team1_str.endswith(']'):
-                team1_str = team1_str[1:-1]
-            team1_required = [int(x.strip()) for x in team1_str.split(',') if x.strip()]
-            
-            # Parse team 2
-            team2_str = parts[2].strip()
-            if team2_str.startswith('[') and team2_str.endswith(']'):
-                team2_str = team2_str[1:-1]
-            team2_required = [int(x.strip()) for x in team2_str.split(',') if x.strip()]
-            
-            # Get vectors for both teams
-            team1_vectors, _ = query_vectors(all_vectors, team1_required, [], contract_map)
-            team2_vectors, _ = query_vectors(all_vectors, team2_required, [], contract_map)
-            
-            if not team1_vectors or not team2_vectors:
-                print("One or both teams have no matching vectors")
-                return
-            
-            # Generate strategy
-            strategy = generate_argument_strategy(team1_vectors, team2_vectors, contract_map)
-            
-            print(f"\n=== LEGAL ARGUMENT STRATEGY ===")
-            print(f"Team 1 (Plaintiff): {strategy['plaintiff_analysis']['team_size']} vectors")
-            print(f"Team 2 (Defendant): {strategy['defendant_analysis']['team_size']} vectors")
-            print(f"Strategic Advantage: {strategy['strategic_advantage']}")
-            
-            print(f"\nTOP ATTACK TARGETS (Team 2 vulnerabilities):")
-            for i, target in enumerate(strategy['attack_targets'][:3], 1):
-                print(f"  {i}. ID {target['variable']}: {target['description']}")
-                print(f"     Priority: {target['priority']:.3f} | Impact: {target['dependency']} paths eliminated")
-                print(f"     Fragility: {target['fragility']} | Criticality: {target['criticality']:.3f}")
-            
-            must_establish = strategy['must_establish']
-            if must_establish:
-                print(f"\nMUST ESTABLISH (Team 1 core elements):")
-                for var_id in must_establish:
-                    desc = contract_map.get(var_id, {}).get('description', 'Unknown')
-                    print(f"  ID {var_id}: {desc}")
-            
-            if strategy['plaintiff_vulnerabilities']:
-                print(f"\nTEAM 1 VULNERABILITIES (protect these):")
-                for vuln in strategy['plaintiff_vulnerabilities']:
-                    print(f"  ID {vuln['variable']}: {vuln['description']}")
-                    print(f"    Criticality: {vuln['criticality']:.3f} | Impact if lost: {vuln['dependency']} paths")
-            
-            print(f"\nCONTESTED GROUND: {strategy['contested_ground']} overlapping vectors")
-            print(f"DEFENSE POSITIONS: {strategy['defense_positions']} unique to Team 1")
-            
-            # Resource allocation recommendations
-            print(f"\nRESOURCE ALLOCATION RECOMMENDATIONS:")
-            total_core = len(must_establish)
-            total_attacks = len(strategy['attack_targets'][:3])
-            
-            if total_core > 0:
-                print(f"  Core Elements: 40% of resources ({total_core} elements)")
-            if total_attacks > 0:
-                print(f"  Attack Targets: 30% of resources ({total_attacks} targets)")
-            print(f"  Defense/Support: 20% of resources")
-            print(f"  Contingency: 10% of resources")
-            
-        except ValueError as e:
-            print(f"Error parsing teams: {e}")
-            
-    elif cmd == 'vulnerability_scan':
-        if len(parts) < 2:
-            print("Error: Missing team specification")
-            print("Usage: vulnerability_scan <team_elements>")
-            return
+        # Get matching vectors
+        found_vectors, _ = query_vectors(all_vectors, required, forbidden, contract_map, index=_loaded_vector_index())
         
-        try:
-            # Parse team elements
-            team_str = parts[1].strip()
-            if team_str.startswith('[') and team_str.endswith(']'):
-                team_str = team_str[1:-1]
-            team_required = [int(x.strip()) for x in team_str.split(',') if x.strip()]
-            
-            # Get vectors
-            team_vectors, _ = query_vectors(all_vectors, team_required, [], contract_map)
-            
-            if not team_vectors:
-                print("No vectors found matching the criteria")
-                return
-            
-            # Analyze vulnerabilities
-            analysis = team_semantic_analysis(team_vectors, contract_map, "Target Team")
-            
-            print(f"\n=== VULNERABILITY SCAN ===")
-            print(f"Team size: {analysis['team_size']} vectors")
-            
-            # Sort by vulnerability (high criticality = vulnerable)
-            var_analysis = analysis['variable_analysis']
-            vulnerabilities = sorted(var_analysis.items(), 
-                                   key=lambda x: x[1]['criticality'], reverse=True)
-            
-            print(f"\nTOP VULNERABILITIES:")
-            for i, (var_id, data) in enumerate(vulnerabilities[:5], 1):
-                risk_level = "HIGH" if data['criticality'] > 0.5 else "MEDIUM" if data['criticality'] > 0.2 else "LOW"
-                evidence_need = "HIGH" if data['fragility'] <= 2 else "MEDIUM" if data['fragility'] <= 4 else "LOW"
-                
-                print(f"  {i}. ID {var_id}: {data['description']}")
-                print(f"     Risk Level: {risk_level} | Criticality: {data['criticality']:.3f}")
-                print(f"     Attack Impact: Eliminates {data['dependency']} compliance paths")
-                print(f"     Evidence Needed to Attack: {evidence_need} (complexity: {data['fragility']})")
-                print(f"     Support Level: {data['support']:.1%} of scenarios")
-            
-            # Defensive recommendations
-            high_risk_vars = [var_id for var_id, data in vulnerabilities if data['criticality'] > 0.5]
-            if high_risk_vars:
-                print(f"\nDEFENSIVE RECOMMENDATIONS:")
-                print(f"  HIGH PRIORITY: Strengthen evidence for {len(high_risk_vars)} high-risk elements")
-                for var_id in high_risk_vars[:3]:
-                    desc = contract_map.get(var_id, {}).get('description', 'Unknown')
-                    print(f"    - Fortify ID {var_id}: {desc}")
-            
-        except ValueError as e:
-            print(f"Error parsing team: {e}")
-            
-    elif cmd == 'simulate_attack':
-        if len(parts) < 3:
-            print("Error: Missing team or target specification")
-            print("Usage: simulate_attack <team_elements> <target_variable>")
-            print("Example: simulate_attack [1,2,3,4] 2")
+        if not found_vectors:
+            print("No vectors found matching the criteria")
             return
         
-        try:
-            # Parse team elements
-            team_str = parts[1].strip()
-            if team_str.startswith('[') and team_str.endswith(']'):
-                team_str = team_str[1:-1]
-            team_required = [int(x.strip()) for x in team_str.split(',') if x.strip()]
-            
-            # Parse target variable
-            target_var = int(parts[2])
-            
-            # Get vectors
-            team_vectors, _ = query_vectors(all_vectors, team_required, [], contract_map)
-            
-            if not team_vectors:
-                print("No vectors found matching the criteria")
-                return
-            
-            # Simulate attack
-            impact = simulate_attack_impact(team_vectors, target_var, contract_map)
-            
-            print(f"\n=== ATTACK SIMULATION ===")
-            print(f"Target: ID {impact['target_variable']} ({impact['target_description']})")
-            print(f"Impact: {impact['vectors_eliminated']} of {impact['original_team_size']} vectors eliminated")
-            print(f"Damage: {impact['impact_percentage']:.1f}% of opponent's legal theories destroyed")
-            
-            if impact['team_still_viable']:
-                print(f"Result: Target team reduced to {impact['modified_team_size']} vectors")
-                if impact.get('new_core'):
-                    print(f"New core requirements:")
-                    for var_id in impact['new_core']:
-                        desc = contract_map.get(var_id, {}).get('description', 'Unknown')
-                        print(f"  ID {var_id}: {desc}")
-                else:
-                    print(f"No core requirements remain after attack")
-            else:
-                print(f"Result: TOTAL VICTORY - Target team becomes non-viable!")
+        # Perform team semantic analysis
+        analysis = team_semantic_analysis(found_vectors, contract_map, "Query Team")
+        
+        print(f"\n=== TEAM SEMANTIC ANALYSIS ===")
+        print(f"Team: {analysis['team_name']}")
+        print(f"Size: {analysis['team_size']} vectors")
+        print(f"Variables: {analysis['total_variables']}")
+        
+        core = analysis['core_elements']
+        if core:
+            print(f"\nCORE ELEMENTS (required in ALL vectors):")
+            for var_id in core:
+                desc = _desc(contract_map, var_id)
+                print(f"  ID {var_id}: {desc}")
+        else:
+            print(f"\nNo core elements found")
+        
+        print(f"\nVARIABLE ANALYSIS:")
+        var_analysis = analysis['variable_analysis']
+        top_vars = heapq.nlargest(10, var_analysis.items(), key=lambda x: x[1]['criticality'])
+        
+        for var_id, data in top_vars:  # Top 10 by criticality
+            print(f"  ID {var_id}: {data['description']}")
+            print(f"    Support: {data['support']:.3f} | Fragility: {data['fragility']} | "
+                  f"Criticality: {data['criticality']:.3f}")
+            print(f"    Dependency: {data['dependency']} | Leverage: {data['leverage']:.3f} | "
+                  f"Essential: {data['essential']}")
             
-        except ValueError as e:
-            print(f"Error parsing parameters: {e}")
-
-def process_command(command, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map, filename=None):
-    """Enhanced command processing with team semantics"""
-    print(f"\nProcessing command: {command}")
-    
-    try:
-        parts = shlex.split(command)
     except ValueError as e:
-        print(f"Error: Command parsing failed. Check for unclosed quotes. Details: {e}")
-        return
+        print(f"Error parsing elements: {e}")
 
-    if not parts:
-        return
-    
-    cmd = parts[0].lower()
-    
-    # Check if it's a team semantic command
-    if cmd in ('analyze_team', 'compare_teams', 'vulnerability_scan', 'simulate_attack'):
-        process_team_semantic_command(parts, all_vectors, contract_map)
+def _cmd_compare_teams(parts, all_vectors, contract_map):
+    """compare_teams <team1> <team2>: legal argument strategy for two teams"""
+    if len(parts) < 3:
+        print("Error: Missing team specifications")
+        print("Usage: compare_teams <team1_elements> <team2_elements>")
+        print("Example: compare_teams [1,2,3] [4,5,6]")
         return
     
-    # Enhanced help
-    if cmd == 'help':
-        print("\nEnhanced Vector Query Tool - Commands:")
-        print("\n--- BASIC QUERIES ---")
-        print("  help                  - Show this help menu")
-        print("  path <elements>       - Find vectors matching path [1,-2,3] (1=required, -2=forbidden)")
-        print("  path_zdd <elements>   - ZDD-aware analysis showing per-ZDD results")
-        print("  path_subject <subject> [elements] - Find vectors with contracts where subject1 or subject2 is <subject>")
-        print("  count                 - Count total vectors in the file")
-        print("  sample <n>            - Show first n vectors from the file")
-        
-        print("\n--- SUBJECT/CONTRACT QUERIES ---")
-        print("  subject1_desc <subject> - Find descriptions where subject1 is <subject>")
-        print("  subject2_desc <subject> - Find descriptions where subject2 is <subject>")
-        print("  is_subject1_desc <subject> <description> - Check if <subject> is subject1 of <description>")
-        print("  violates <subject1> <subject2> <description> - Find vectors where contract could be violated")
-        print("  responsibility <subject> <description> <norm_key> [fulfills|violates] - Find consequences for subject")
-        
-        print("\n--- CLASSICAL TEAM SEMANTICS ---")
-        print("  split <id1> <id2>     - Split vectors into Y (id1 present) and Z (id2 present)")
-        print("  permissive <id1> <id2> - Check if id1 and id2 are independent")
-        
-        print("\n--- LEGAL STRATEGY ANALYSIS ---")
-        print("  analyze_team <required> [forbidden] - Comprehensive team semantic analysis")
-        print("  compare_teams <team1> <team2> - Generate legal argument strategy")
-        print("  vulnerability_scan <team> - Find vulnerabilities in a legal position")
-        print("  simulate_attack <team> <target> - Simulate impact of attacking specific element")
-        
-        print("\n--- EXAMPLES ---")
-        print("  analyze_team [1,2,3]  - Analyze team with required elements 1,2,3")
-        print("  compare_teams [1,2] [3,4] - Compare plaintiff vs defendant teams")
-        print("  vulnerability_scan [5,6,7] - Find weak points in team with elements 5,6,7")
-        print("  simulate_attack [1,2,3,4] 2 - Simulate attacking element 2 in team [1,2,3,4]")
-        return
-    
-    # Process existing commands
-    elif cmd == 'path':
-        if len(parts) < 2:
-            print("Error: Missing path elements")
-            return
-        
-        try:
-            path_str = parts[1].strip()
-            if path_str.startswith('[') and path_str.endswith(']'):
-                path_str = path_str[1:-1]
-            path_elements = [int(x) for x in path_str.split(',')]
-            required = [x for x in path_elements if x > 0]
-            forbidden = [-x for x in path_elements if x < 0]
-            
-            # Use ZDD-aware query
-            zdd_results, found_vectors, necessary_ids = query_vectors_zdd_aware(required, forbidden, contract_map)
-            
-            print(f"Found {len(found_vectors)} matching vectors across {len(zdd_results)} ZDDs")
-            
-            # Show ZDD-specific results
-            for zdd_result in zdd_results:
-                print(f"ZDD {zdd_result['zdd_name']}: {zdd_result['vector_count']} vectors - {zdd_result['status']}")
-                if zdd_result['status'] == "NOT_APPLICABLE":
-                    print(f"  Reason: {zdd_result['status_reason']}")
-            
-            if necessary_ids:
-                print("\nCore elements (in all vectors):")
-                for nid in sorted(necessary_ids):
-                    desc = contract_map.get(nid, {}).get('description', 'Unknown')
-                    print(f"  ID {nid}: {desc}")
-            
-            # Show sample vectors
-            for i, vector in enumerate(found_vectors[:5]):
-                vector_details = []
-                for vid in vector:
-                    contract = contract_map.get(vid)
-                    if contract:
-                        vector_details.append(f"ID {vid}: '{contract['description']}'")
-                    else:
-                        vector_details.append(f"ID {vid}: 'Unknown contract'")
-                print(f"Vector {i+1}: {vector} -> {', '.join(vector_details)}")
-                    
-        except ValueError:
-            print("Error: Invalid path format. Use format [1,-2,3]")
-    
-    elif cmd == 'path_zdd':
-        if len(parts) < 2:
-            print("Error: Missing path elements")
-            return
-        
-        try:
-            path_str = parts[1].strip()
-            if path_str.startswith('[') and path_str.endswith(']'):
-                path_str = path_str[1:-1]
-            path_elements = [int(x) for x in path_str.split(',')]
-            required = [x for x in path_elements if x > 0]
-            forbidden = [-x for x in path_elements if x < 0]
-            
-            # Use ZDD-aware query
-            zdd_results, found_vectors, necessary_ids = query_vectors_zdd_aware(required, forbidden, contract_map)
-            
-            print(f"ZDD-AWARE ANALYSIS:")
-            print(f"Query: required={required}, forbidden={forbidden}")
-            print(f"Total vectors found: {len(found_vectors)}")
-            print(f"ZDDs analyzed: {len(zdd_results)}")
-            print()
-            
-            # Detailed ZDD breakdown
-            for zdd_result in zdd_results:
-                print(f"ZDD {zdd_result['zdd_name']} (Magic: {zdd_result['zdd_magic']}, Arrays: {zdd_result['zdd_arrays']}):")
-                print(f"  Status: {zdd_result['status']}")
-                print(f"  Reason: {zdd_result['status_reason']}")
-                print(f"  Domain: {zdd_result['zdd_domain']['domain_type']} (IDs {zdd_result['zdd_domain']['min_id']}-{zdd_result['zdd_domain']['max_id']})")
-                print(f"  Vectors: {zdd_result['vector_count']}")
-                
-                if zdd_result['applicable_required']:
-                    print(f"  Applicable required elements: {zdd_result['applicable_required']}")
-                if zdd_result['non_applicable_required']:
-                    print(f"  Non-applicable required elements: {zdd_result['non_applicable_required']}")
-                
-                if zdd_result['necessary_ids']:
-                    print(f"  Core elements in this ZDD:")
-                    for nid in sorted(zdd_result['necessary_ids']):
-                        desc = contract_map.get(nid, {}).get('description', 'Unknown')
-                        print(f"    ID {nid}: {desc}")
-                
-                if zdd_result['found_vectors']:
-                    print(f"  Sample vectors:")
-                    for i, vector in enumerate(zdd_result['found_vectors'][:3]):
-                        print(f"    Vector {i+1}: {vector}")
-                
-                print()
-            
-            # Summary
-            violated_zdds = [z for z in zdd_results if z['status'] == 'VIOLATED']
-            fulfilled_zdds = [z for z in zdd_results if z['status'] == 'FULFILLED']
-            not_applicable_zdds = [z for z in zdd_results if z['status'] == 'NOT_APPLICABLE']
-            
-            if violated_zdds:
-                print(f"VIOLATED ZDDs ({len(violated_zdds)}):")
-                for zdd in violated_zdds:
-                    print(f"  - {zdd['zdd_name']}: {zdd['status_reason']}")
-            
-            if fulfilled_zdds:
-                print(f"FULFILLED ZDDs ({len(fulfilled_zdds)}):")
-                for zdd in fulfilled_zdds:
-                    print(f"  - {zdd['zdd_name']} ({zdd['vector_count']} vectors)")
-            
-            if not_applicable_zdds:
-                print(f"NOT APPLICABLE ZDDs ({len(not_applicable_zdds)}):")
-                for zdd in not_applicable_zdds:
-                    print(f"  - {zdd['zdd_name']}: {zdd['status_reason']}")
-                    
-        except ValueError:
-            print("Error: Invalid path format. Use format [1,-2,3]")
-    
-    elif cmd == 'path_subject':
-        if len(parts) < 2:
-            print("Error: Missing subject")
-            return
+    try:
+        # Parse team 1
+        team1_required = _parse_id_list(parts[1])
         
-        subject = parts[1].strip()
-        required = []
-        forbidden = []
+        # Parse team 2
+        team2_required = _parse_id_list(parts[2])
         
-        if len(parts) > 2:
-            try:
-                path_str = parts[2].strip()
-                if path_str.startswith('[') and path_str.endswith(']'):
-                    path_str = path_str[1:-1]
-                path_elements = [int(x) for x in path_str.split(',')]
-                required = [x for x in path_elements if x > 0]
-                forbidden = [-x for x in path_elements if x < 0]
-            except ValueError:
-                print("Error: Invalid elements format. Use format [1,-2,3]")
-                return
+        # Get vectors for both teams
+        team1_vectors, _ = query_vectors(all_vectors, team1_required, [], contract_map, index=_loaded_vector_index())
+        team2_vectors, _ = query_vectors(all_vectors, team2_required, [], contract_map, index=_loaded_vector_index())
         
-        allowed_ids = set(subject1_index.get(subject, []) + subject2_index.get(subject, []))
-        if not allowed_ids:
-            print(f"No contracts found with subject: {subject}")
+        if not team1_vectors or not team2_vectors:
+            print("One or both teams have no matching vectors")
             return
         
-        found_vectors, necessary_ids = query_vectors(all_vectors, required, forbidden, contract_map, allowed_ids=allowed_ids)
-        print(f"Found {len(found_vectors)} matching vectors for subject '{subject}'")
+        # Generate strategy
+        strategy = generate_argument_strategy(team1_vectors, team2_vectors, contract_map)
+        
+        print(f"\n=== LEGAL ARGUMENT STRATEGY ===")
+        print(f"Team 1 (Plaintiff): {strategy['plaintiff_analysis']['team_size']} vectors")
+        print(f"Team 2 (Defendant): {strategy['defendant_analysis']['team_size']} vectors")
+        print(f"Strategic Advantage: {strategy['strategic_advantage']}")
+        
+        print(f"\nTOP ATTACK TARGETS (Team 2 vulnerabilities):")
+        for i, target in enumerate(strategy['attack_targets'][:3], 1):
+            print(f"  {i}. ID {target['variable']}: {target['description']}")
+            print(f"     Priority: {target['priority']:.3f} | Impact: {target['dependency']} paths eliminated")
+            print(f"     Fragility: {target['fragility']} | Criticality: {target['criticality']:.3f}")
+        
+        must_establish = strategy['must_establish']
+        if must_establish:
+            print(f"\nMUST ESTABLISH (Team 1 core elements):")
+            for var_id in must_establish:
+                desc = _desc(contract_map, var_id)
+                print(f"  ID {var_id}: {desc}")
+        
+        if strategy['plaintiff_vulnerabilities']:
+            print(f"\nTEAM 1 VULNERABILITIES (protect these):")
+            for vuln in strategy['plaintiff_vulnerabilities']:
+                print(f"  ID {vuln['variable']}: {vuln['description']}")
+                print(f"    Criticality: {vuln['criticality']:.3f} | Impact if lost: {vuln['dependency']} paths")
+        
+        print(f"\nCONTESTED GROUND: {strategy['contested_ground']} overlapping vectors")
+        print(f"DEFENSE POSITIONS: {strategy['defense_positions']} unique to Team 1")
+        
+        # Resource allocation recommendations
+        print(f"\nRESOURCE ALLOCATION RECOMMENDATIONS:")
+        total_core = len(must_establish)
+        total_attacks = len(strategy['attack_targets'][:3])
+        
+        if total_core > 0:
+            print(f"  Core Elements: 40% of resources ({total_core} elements)")
+        if total_attacks > 0:
+            print(f"  Attack Targets: 30% of resources ({total_attacks} targets)")
+        print(f"  Defense/Support: 20% of resources")
+        print(f"  Contingency: 10% of resources")
         
-        if necessary_ids:
-            print("Core elements (in all vectors):")
-            for nid in sorted(necessary_ids):
-                desc = contract_map.get(nid, {}).get('description', 'Unknown')
-                print(f"  ID {nid}: {desc}")
+    except ValueError as e:
+        print(f"Error parsing teams: {e}")
+
+def _cmd_vulnerability_scan(parts, all_vectors, contract_map):
+    """vulnerability_scan <team>: weak points of a legal position"""
+    if len(parts) < 2:
+        print("Error: Missing team specification")
+        print("Usage: vulnerability_scan <team_elements>")
+        return
     
-    elif cmd == 'subject1_desc':
-        if len(parts) < 2:
-            print("Error: Missing subject")
-            return
+    try:
+        # Parse team elements
+        team_required = _parse_id_list(parts[1])
         
-        subject = parts[1].strip()
-        contract_ids = subject1_index.get(subject, [])
-        if not contract_ids:
-            print(f"No contracts found where subject1 is: {subject}")
-            return
+        # Get vectors
+        team_vectors, _ = query_vectors(all_vectors, team_required, [], contract_map, index=_loaded_vector_index())
         
-        print(f"Contracts where subject1 is '{subject}':")
-        for cid in contract_ids:
-            contract = contract_map.get(cid, {})
-            print(f"ID {cid}: '{contract.get('description', 'Unknown contract')}'")
-    
-    elif cmd == 'subject2_desc':
-        if len(parts) < 2:
-            print("Error: Missing subject")
+        if not team_vectors:
+            print("No vectors found matching the criteria")
             return
         
-        subject = parts[1].strip()
-        contract_ids = subject2_index.get(subject, [])
-        if not contract_ids:
-            print(f"No contracts found where subject2 is: {subject}")
-            return
+        # Analyze vulnerabilities
+        analysis = team_semantic_analysis(team_vectors, contract_map, "Target Team")
         
-        print(f"Contracts where subject2 is '{subject}':")
-        for cid in contract_ids:
-            contract = contract_map.get(cid, {})
-            print(f"ID {cid}: '{contract.get('description', 'Unknown contract')}'")
-    
-    elif cmd == 'is_subject1_desc':
-        if len(parts) < 3:
-            print("Error: Missing subject or description")
-            return
-        
-        subject = parts[1].strip()
-        description = parts[2].strip()
-        contract_ids = subject1_index.get(subject, [])
+        print(f"\n=== VULNERABILITY SCAN ===")
+        print(f"Team size: {analysis['team_size']} vectors")
         
-        if not contract_ids:
-            print(f"No, '{subject}' is not subject1 of any contract with description containing '{description}'")
-            return
+        # Sort by vulnerability (high criticality = vulnerable)
+        var_analysis = analysis['variable_analysis']
+        vulnerabilities = heapq.nlargest(5, var_analysis.items(), key=lambda x: x[1]['criticality'])
         
-        matching_ids = []
-        for cid in contract_ids:
-            contract = contract_map.get(cid, {})
-            if description.lower() in contract.get('description', '').lower():
-                matching_ids.append(cid)
+        print(f"\nTOP VULNERABILITIES:")
+        for i, (var_id, data) in enumerate(vulnerabilities, 1):
+            crit = data['criticality']
+            frag = data['fragility']
+            risk_level = "HIGH" if crit > 0.5 else "MEDIUM" if crit > 0.2 else "LOW"
+            evidence_need = "HIGH" if frag <= 2 else "MEDIUM" if frag <= 4 else "LOW"
+            
+            print(f"  {i}. ID {var_id}: {data['description']}")
+            print(f"     Risk Level: {risk_level} | Criticality: {crit:.3f}")
+            print(f"     Attack Impact: Eliminates {data['dependency']} compliance paths")
+            print(f"     Evidence Needed to Attack: {evidence_need} (complexity: {frag})")
+            print(f"     Support Level: {data['support']:.1%} of scenarios")
+        
+        # Defensive recommendations
+        # High-risk variables lead the ranking, so the top three come from the top five
+        high_risk_count = sum(1 for data in var_analysis.values() if data['criticality'] > 0.5)
+        if high_risk_count:
+            print(f"\nDEFENSIVE RECOMMENDATIONS:")
+            print(f"  HIGH PRIORITY: Strengthen evidence for {high_risk_count} high-risk elements")
+            for var_id in [var_id for var_id, data in vulnerabilities[:3] if data['criticality'] > 0.5]:
+                desc = _desc(contract_map, var_id)
+                print(f"    - Fortify ID {var_id}: {desc}")
         
-        if matching_ids:
-            print(f"Yes, '{subject}' is subject1 of contracts with description containing '{description}':")
-            for cid in matching_ids:
-                print(f"ID {cid}: '{contract_map[cid]['description']}'")
-        else:
-            print(f"No, '{subject}' is not subject1 of any contract with description containing '{description}'")
+    except ValueError as e:
+        print(f"Error parsing team: {e}")
+
+def _cmd_simulate_attack(parts, all_vectors, contract_map):
+    """simulate_attack <team> <target>: impact of attacking one element"""
+    if len(parts) < 3:
+        print("Error: Missing team or target specification")
+        print("Usage: simulate_attack <team_elements> <target_variable>")
+        print("Example: simulate_attack [1,2,3,4] 2")
+        return
     
-    elif cmd == 'violates':
-        if len(parts) < 4:
-            print("Error: Missing subject1, subject2, or description")
-            return
-        
-        subject1 = parts[1].strip()
-        subject2 = parts[2].strip()
-        description = parts[3].strip()
+    try:
+        # Parse team elements
+        team_required = _parse_id_list(parts[1])
         
-        contract_ids = subject1_index.get(subject1, [])
-        if not contract_ids:
-            print(f"No contracts found with subject1='{subject1}', subject2='{subject2}', and description='{description}'")
-            return
+        # Parse target variable
+        target_var = int(parts[2])
         
-        matching_ids = []
-        for cid in contract_ids:
-            contract = contract_map.get(cid, {})
-            if (contract.get('subject2') == subject2 and
-                contract.get('description', '').lower() == description.lower()):
-                matching_ids.append(cid)
+        # Get vectors
+        team_vectors, _ = query_vectors(all_vectors, team_required, [], contract_map, index=_loaded_vector_index())
         
-        if not matching_ids:
-            print(f"No contracts found with subject1='{subject1}', subject2='{subject2}', and description='{description}'")
+        if not team_vectors:
+            print("No vectors found matching the criteria")
             return
         
-        print(f"Found {len(matching_ids)} matching contract(s):")
-        for cid in matching_ids:
-            contract = contract_map[cid]
-            print(f"ID {cid}: description='{contract['description']}', "
-                  f"subject1={contract['subject1']}, subject2={contract['subject2']}, "
-                  f"type={contract['type']}, key='{contract['key']}'")
-        
-        forbidden = matching_ids
-        print(f"\nQuerying vectors where contract IDs {matching_ids} are violated:")
-        try:
-            found_vectors, _ = query_vectors(all_vectors, [], forbidden, contract_map)
-            if not found_vectors:
-                print(f"No vectors found where contract IDs {matching_ids} are violated")
+        # Simulate attack over a team-local index; a team with every loaded
+        # vector reuses the global one
+        if len(team_vectors) == len(all_vectors):
+            team_index = _loaded_vector_index()
+        else:
+            team_index = build_vector_index(team_vectors)
+        impact = simulate_attack_impact(team_vectors, target_var, contract_map, index=team_index)
+        
+        print(f"\n=== ATTACK SIMULATION ===")
+        print(f"Target: ID {impact['target_variable']} ({impact['target_description']})")
+        print(f"Impact: {impact['vectors_eliminated']} of {impact['original_team_size']} vectors eliminated")
+        print(f"Damage: {impact['impact_percentage']:.1f}% of opponent's legal theories destroyed")
+        
+        if impact['team_still_viable']:
+            print(f"Result: Target team reduced to {impact['modified_team_size']} vectors")
+            if impact.get('new_core'):
+                print(f"New core requirements:")
+                for var_id in impact['new_core']:
+                    desc = _desc(contract_map, var_id)
+                    print(f"  ID {var_id}: {desc}")
             else:
-                print(f"Found {len(found_vectors)} violation scenarios")
-        except Exception as e:
-            print(f"Error querying vectors: {e}")
-    
-    elif cmd == 'responsibility':
-        if len(parts) < 4:
-            print("Error: Missing subject, description, or norm_key")
-            return
-        
-        subject = parts[1].strip()
-        description = parts[2].strip()
-        norm_key = parts[3].strip()
-        mode = 'both' if len(parts) == 4 else parts[4].strip().lower()
-        
-        if mode not in ('fulfills', 'violates', 'both'):
-            print("Error: Mode must be 'fulfills', 'violates', or omitted (for both)")
-            return
-        
-        contract_ids = set(subject1_index.get(subject, []) + subject2_index.get(subject, []))
-        if not contract_ids:
-            print(f"No contracts found with subject='{subject}' and description='{description}'")
-            return
-        
-        matching_ids = []
-        for cid in contract_ids:
-            contract = contract_map.get(cid, {})
-            contract_desc = contract.get('description', '').lower()
-            # Strip keyword tags from description for matching (e.g., "(delivery/installation)" -> "")
-            import re
-            clean_description = re.sub(r'\s*\([^)]*\)\s*', '', description.lower())
-            if contract_desc == clean_description:
-                matching_ids.append(cid)
-        
-        if not matching_ids:
-            print(f"No contracts found with subject='{subject}' and description='{description}'")
-            return
-        
-        # Find the main contract
-        main_contract = contract_map[matching_ids[0]]
-        print(f"OBLIGATION ANALYSIS:")
-        print(f"Subject: {subject}")
-        print(f"Obligation: {main_contract['description']}")
-        print(f"Between: {main_contract['subject1']} and {main_contract['subject2']}")
+                print(f"No core requirements remain after attack")
+        else:
+            print(f"Result: TOTAL VICTORY - Target team becomes non-viable!")
         
-        # Get norm information - look for contract with matching key
-        norm_contract = None
-        for cid, contract in contract_map.items():
-            if contract.get('key') == norm_key:
-                norm_contract = contract
-                break
+    except ValueError as e:
+        print(f"Error parsing parameters: {e}")
+
+_TEAM_HANDLERS = {
+    'analyze_team': _cmd_analyze_team,
+    'compare_teams': _cmd_compare_teams,
+    'vulnerability_scan': _cmd_vulnerability_scan,
+    'simulate_attack': _cmd_simulate_attack,
+}
+
+def process_team_semantic_command(parts, all_vectors, contract_map):
+    """Process team semantic analysis commands"""
+    _TEAM_HANDLERS[parts[0].lower()](parts, all_vectors, contract_map)
+
+def _cmd_help(parts, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+              key_index, clause_by_contract, contract_triple_index, subject_union_index, filename):
+    """help: show the command menu"""
+    print("\nEnhanced Vector Query Tool - Commands:")
+    print("\n--- BASIC QUERIES ---")
+    print("  help                  - Show this help menu")
+    print("  path <elements>       - Find vectors matching path [1,-2,3] (1=required, -2=forbidden)")
+    print("  path_zdd <elements>   - ZDD-aware analysis showing per-ZDD results")
+    print("  path_subject <subject> [elements] - Find vectors with contracts where subject1 or subject2 is <subject>")
+    print("  count                 - Count total vectors in the file")
+    print("  sample <n>            - Show first n vectors from the file")
+    
+    print("\n--- SUBJECT/CONTRACT QUERIES ---")
+    print("  subject1_desc <subject> - Find descriptions where subject1 is <subject>")
+    print("  subject2_desc <subject> - Find descriptions where subject2 is <subject>")
+    print("  is_subject1_desc <subject> <description> - Check if <subject> is subject1 of <description>")
+    print("  violates <subject1> <subject2> <description> - Find vectors where contract could be violated")
+    print("  responsibility <subject> <description> <norm_key> [fulfills|violates] - Find consequences for subject")
+    
+    print("\n--- CLASSICAL TEAM SEMANTICS ---")
+    print("  split <id1> <id2>     - Split vectors into Y (id1 present) and Z (id2 present)")
+    print("  permissive <id1> <id2> - Check if id1 and id2 are independent")
+    
+    print("\n--- LEGAL STRATEGY ANALYSIS ---")
+    print("  analyze_team <required> [forbidden] - Comprehensive team semantic analysis")
+    print("  compare_teams <team1> <team2> - Generate legal argument strategy")
+    print("  vulnerability_scan <team> - Find vulnerabilities in a legal position")
+    print("  simulate_attack <team> <target> - Simulate impact of attacking specific element")
+    
+    print("\n--- EXAMPLES ---")
+    print("  analyze_team [1,2,3]  - Analyze team with required elements 1,2,3")
+    print("  compare_teams [1,2] [3,4] - Compare plaintiff vs defendant teams")
+    print("  vulnerability_scan [5,6,7] - Find weak points in team with elements 5,6,7")
+    print("  simulate_attack [1,2,3,4] 2 - Simulate attacking element 2 in team [1,2,3,4]")
+
+def _cmd_path(parts, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+              key_index, clause_by_contract, contract_triple_index, subject_union_index, filename):
+    """path <elements>: vectors matching a path like [1,-2,3]"""
+    if len(parts) < 2:
+        print("Error: Missing path elements")
+        return
+    
+    try:
+        path_elements = _parse_id_list(parts[1])
+        required = [x for x in path_elements if x > 0]
+        forbidden = [-x for x in path_elements if x < 0]
         
-        if not norm_contract:
-            print(f"No norm found with key='{norm_key}'")
-            return
+        # Use ZDD-aware query
+        zdd_results, found_vectors, necessary_ids = query_vectors_zdd_aware(required, forbidden, contract_map)
         
-        print(f"Norm found: {norm_contract['description']}")
+        print(f"Found {len(found_vectors)} matching vectors across {len(zdd_results)} ZDDs")
         
-        # Look for related clauses
-        related_clauses = []
-        for clause_key, clause in clause_map.items():
-            if (clause.get('condition_id1') == matching_ids[0] or 
-                clause.get('condition_id2') == matching_ids[0] or
-                clause.get('consequence_id') == matching_ids[0]):
-                related_clauses.append(clause)
+        # Show ZDD-specific results
+        for zdd_result in zdd_results:
+            print(f"ZDD {zdd_result['zdd_name']}: {zdd_result['vector_count']} vectors - {zdd_result['status']}")
+            if zdd_result['status'] == "NOT_APPLICABLE":
+                print(f"  Reason: {zdd_result['status_reason']}")
         
-        if related_clauses:
-            print(f"Found {len(related_clauses)} related clauses")
+        if necessary_ids:
+            print("\nCore elements (in all vectors):")
+            for nid in sorted(necessary_ids):
+                desc = _desc(contract_map, nid)
+                print(f"  ID {nid}: {desc}")
         
-        # Analyze the specific mode requested
-        for cid in matching_ids:
-            if mode in ('fulfills', 'both'):
-                print(f"\nFULFILLMENT ANALYSIS:")
-                required = [cid]
-                forbidden = []
+        # Show sample vectors
+        for i, vector in enumerate(found_vectors[:5]):
+            vector_details = []
+            for vid in vector:
+                contract = contract_map.get(vid)
+                if contract:
+                    vector_details.append(f"ID {vid}: '{contract['description']}'")
+                else:
+                    vector_details.append(f"ID {vid}: 'Unknown contract'")
+            print(f"Vector {i+1}: {vector} -> {', '.join(vector_details)}")
                 
-                try:
-                    zdd_results, found_vectors, necessary_ids = query_vectors_zdd_aware(required, forbidden, contract_map)
-                    if found_vectors:
-                        # Find what other IDs are always present when this ID is fulfilled
-                        if necessary_ids:
-                            print(f"CONSEQUENCES - Always required when fulfilled:")
-                            for nid in sorted(necessary_ids):
-                                if nid != cid:  # Don't show the obligation itself
-                                    contract = contract_map.get(nid, {})
-                                    desc = contract.get('description', 'Unknown contract')
-                                    subject1 = contract.get('subject1', 'Unknown')
-                                    subject2 = contract.get('subject2', 'Unknown')
-                                    print(f"  • {desc} (between {subject1} and {subject2})")
-                        else:
-                            print(f"No other obligations consistently required when fulfilled")
-                        
-                        # Show per-ZDD fulfillment consequences
-                        fulfilled_zdds = [z for z in zdd_results if z['status'] == 'FULFILLED']
-                        if fulfilled_zdds:
-                            print(f"\nFulfillment consequences by contract section:")
-                            for zdd in fulfilled_zdds:
-                                if zdd['necessary_ids']:
-                                    zdd_necessary = [nid for nid in zdd['necessary_ids'] if nid != cid]
-                                    if zdd_necessary:
-                                        print(f"\n  When fulfilled in {zdd['zdd_name']}:")
-                                        for nid in sorted(zdd_necessary):
-                                            contract = contract_map.get(nid, {})
-                                            desc = contract.get('description', 'Unknown contract')
-                                            print(f"    • {desc}")
-                    else:
-                        print(f"No scenarios found where obligation is fulfilled")
-                except Exception as e:
-                    print(f"Error analyzing fulfillment: {e}")
+    except ValueError:
+        print("Error: Invalid path format. Use format [1,-2,3]")
+
+def _cmd_path_zdd(parts, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                  key_index, clause_by_contract, contract_triple_index, subject_union_index, filename):
+    """path_zdd <elements>: ZDD-aware path analysis with per-ZDD results"""
+    if len(parts) < 2:
+        print("Error: Missing path elements")
+        return
+    
+    try:
+        path_elements = _parse_id_list(parts[1])
+        required = [x for x in path_elements if x > 0]
+        forbidden = [-x for x in path_elements if x < 0]
+        
+        # Use ZDD-aware query
+        zdd_results, found_vectors, necessary_ids = query_vectors_zdd_aware(required, forbidden, contract_map)
+        
+        print(f"ZDD-AWARE ANALYSIS:")
+        print(f"Query: required={required}, forbidden={forbidden}")
+        print(f"Total vectors found: {len(found_vectors)}")
+        print(f"ZDDs analyzed: {len(zdd_results)}")
+        print()
+        
+        # Detailed ZDD breakdown
+        for zdd_result in zdd_results:
+            print(f"ZDD {zdd_result['zdd_name']} (Magic: {zdd_result['zdd_magic']}, Arrays: {zdd_result['zdd_arrays']}):")
+            print(f"  Status: {zdd_result['status']}")
+            print(f"  Reason: {zdd_result['status_reason']}")
+            print(f"  Domain: {zdd_result['zdd_domain']['domain_type']} (IDs {zdd_result['zdd_domain']['min_id']}-{zdd_result['zdd_domain']['max_id']})")
+            print(f"  Vectors: {zdd_result['vector_count']}")
+            
+            if zdd_result['applicable_required']:
+                print(f"  Applicable required elements: {zdd_result['applicable_required']}")
+            if zdd_result['non_applicable_required']:
+                print(f"  Non-applicable required elements: {zdd_result['non_applicable_required']}")
+            
+            if zdd_result['necessary_ids']:
+                print(f"  Core elements in this ZDD:")
+                for nid in sorted(zdd_result['necessary_ids']):
+                    desc = _desc(contract_map, nid)
+                    print(f"    ID {nid}: {desc}")
+            
+            if zdd_result['found_vectors']:
+                print(f"  Sample vectors:")
+                for i, vector in enumerate(zdd_result['found_vectors'][:3]):
+                    print(f"    Vector {i+1}: {vector}")
             
-            if mode in ('violates', 'both'):
-                print(f"\nVIOLATION ANALYSIS:")
-                required = []
-                forbidden = [cid]
+            print()
+        
+        # Summary
+        violated_zdds = [z for z in zdd_results if z['status'] == 'VIOLATED']
+        fulfilled_zdds = [z for z in zdd_results if z['status'] == 'FULFILLED']
+        not_applicable_zdds = [z for z in zdd_results if z['status'] == 'NOT_APPLICABLE']
+        
+        if violated_zdds:
+            print(f"VIOLATED ZDDs ({len(violated_zdds)}):")
+            for zdd in violated_zdds:
+                print(f"  - {zdd['zdd_name']}: {zdd['status_reason']}")
+        
+        if fulfilled_zdds:
+            print(f"FULFILLED ZDDs ({len(fulfilled_zdds)}):")
+            for zdd in fulfilled_zdds:
+                print(f"  - {zdd['zdd_name']} ({zdd['vector_count']} vectors)")
+        
+        if not_applicable_zdds:
+            print(f"NOT APPLICABLE ZDDs ({len(not_applicable_zdds)}):")
+            for zdd in not_applicable_zdds:
+                print(f"  - {zdd['zdd_name']}: {zdd['status_reason']}")
                 
-                try:
-                    zdd_results, found_vectors, necessary_ids = query_vectors_zdd_aware(required, forbidden, contract_map)
-                    if found_vectors:
-                        # Find what other IDs are always present when this ID is absent
-                        if necessary_ids:
-                            print(f"CONSEQUENCES - Always present when violated:")
-                            for nid in sorted(necessary_ids):
-                                contract = contract_map.get(nid, {})
-                                desc = contract.get('description', 'Unknown contract')
-                                subject1 = contract.get('subject1', 'Unknown')
-                                subject2 = contract.get('subject2', 'Unknown')
-                                print(f"  • {desc} (between {subject1} and {subject2})")
-                        
-                        # Check for unsatisfiable sections (0 vectors when ID is absent)
-                        unsatisfiable_sections = []
-                        for zdd_result in zdd_results:
-                            if zdd_result['status'] == 'VIOLATED' and zdd_result['vector_count'] == 0:
-                                unsatisfiable_sections.append(zdd_result['zdd_name'])
-                        
-                        if unsatisfiable_sections:
-                            print(f"\nCRITICAL: Contract becomes invalid when obligation is violated in these sections:")
-                            for section in unsatisfiable_sections:
-                                print(f"  • {section}")
-                        
-                        # Show detailed ZDD breakdown with necessary IDs
-                        applicable_zdds = [z for z in zdd_results if z['vector_count'] > 0]
-                        if applicable_zdds:
-                            print(f"\nViolation consequences by contract section:")
-                            for zdd in applicable_zdds:
-                                if zdd['necessary_ids']:
-                                    print(f"\n  When violated in {zdd['zdd_name']}:")
-                                    for nid in sorted(zdd['necessary_ids']):
-                                        contract = contract_map.get(nid, {})
-                                        desc = contract.get('description', 'Unknown contract')
-                                        print(f"    • {desc}")
-                    else:
-                        print(f"No scenarios found where obligation could be violated")
-                except Exception as e:
-                    print(f"Error analyzing violation: {e}")
+    except ValueError:
+        print("Error: Invalid path format. Use format [1,-2,3]")
+
+def _cmd_path_subject(parts, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                      key_index, clause_by_contract, contract_triple_index, subject_union_index, filename):
+    """path_subject <subject> [elements]: vectors with contracts involving <subject>"""
+    if len(parts) < 2:
+        print("Error: Missing subject")
+        return
     
-    elif cmd == 'split':
-        if len(parts) != 3:
-            print("Error: Must provide exactly two IDs (e.g., split 1 2)")
-            return
-        
+    subject = parts[1].strip()
+    required = []
+    forbidden = []
+    
+    if len(parts) > 2:
         try:
-            id1 = int(parts[1])
-            id2 = int(parts[2])
+            path_elements = _parse_id_list(parts[2])
+            required = [x for x in path_elements if x > 0]
+            forbidden = [-x for x in path_elements if x < 0]
         except ValueError:
-            print("Error: IDs must be integers")
+            print("Error: Invalid elements format. Use format [1,-2,3]")
             return
-        
-        if id1 not in contract_map or id2 not in contract_map:
-            print(f"Error: One or both IDs ({id1}, {id2}) not found in contract map")
-            return
-        
-        print(f"Splitting vectors for ID {id1} ('{contract_map[id1]['description']}') and ID {id2} ('{contract_map[id2]['description']}')")
-        try:
-            Y, Z, success = split_vectors(all_vectors, id1, id2, contract_map)
-            if success:
-                print(f"\nSet Y (IDs from vectors containing ID {id1}):")
-                if Y:
-                    for cid in sorted(Y):
-                        desc = contract_map.get(cid, {}).get('description', 'Unknown contract')
-                        print(f"  ID {cid}: '{desc}'")
+    
+    allowed_ids = subject_union_index.get(subject, frozenset())
+    if not allowed_ids:
+        print(f"No contracts found with subject: {subject}")
+        return
+    
+    found_vectors, necessary_ids = query_vectors(all_vectors, required, forbidden, contract_map, allowed_ids=allowed_ids, index=_loaded_vector_index())
+    print(f"Found {len(found_vectors)} matching vectors for subject '{subject}'")
+    
+    if necessary_ids:
+        print("Core elements (in all vectors):")
+        for nid in sorted(necessary_ids):
+            desc = _desc(contract_map, nid)
+            print(f"  ID {nid}: {desc}")
+
+def _cmd_subject1_desc(parts, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                       key_index, clause_by_contract, contract_triple_index, subject_union_index, filename):
+    """subject1_desc <subject>: descriptions where subject1 is <subject>"""
+    if len(parts) < 2:
+        print("Error: Missing subject")
+        return
+    
+    subject = parts[1].strip()
+    contract_ids = subject1_index.get(subject, [])
+    if not contract_ids:
+        print(f"No contracts found where subject1 is: {subject}")
+        return
+    
+    print(f"Contracts where subject1 is '{subject}':")
+    for cid in contract_ids:
+        print(f"ID {cid}: '{_desc(contract_map, cid, 'Unknown contract')}'")
+
+def _cmd_subject2_desc(parts, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                       key_index, clause_by_contract, contract_triple_index, subject_union_index, filename):
+    """subject2_desc <subject>: descriptions where subject2 is <subject>"""
+    if len(parts) < 2:
+        print("Error: Missing subject")
+        return
+    
+    subject = parts[1].strip()
+    contract_ids = subject2_index.get(subject, [])
+    if not contract_ids:
+        print(f"No contracts found where subject2 is: {subject}")
+        return
+    
+    print(f"Contracts where subject2 is '{subject}':")
+    for cid in contract_ids:
+        print(f"ID {cid}: '{_desc(contract_map, cid, 'Unknown contract')}'")
+
+def _cmd_is_subject1_desc(parts, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                          key_index, clause_by_contract, contract_triple_index, subject_union_index, filename):
+    """is_subject1_desc <subject> <description>: whether <subject> is subject1 of <description>"""
+    if len(parts) < 3:
+        print("Error: Missing subject or description")
+        return
+    
+    subject = parts[1].strip()
+    description = parts[2].strip()
+    contract_ids = subject1_index.get(subject, [])
+    
+    if not contract_ids:
+        print(f"No, '{subject}' is not subject1 of any contract with description containing '{description}'")
+        return
+    
+    matching_ids = []
+    for cid in contract_ids:
+        contract = contract_map.get(cid, {})
+        if description.lower() in contract.get('description', '').lower():
+            matching_ids.append(cid)
+    
+    if matching_ids:
+        print(f"Yes, '{subject}' is subject1 of contracts with description containing '{description}':")
+        for cid in matching_ids:
+            print(f"ID {cid}: '{contract_map[cid]['description']}'")
+    else:
+        print(f"No, '{subject}' is not subject1 of any contract with description containing '{description}'")
+
+def _cmd_violates(parts, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                  key_index, clause_by_contract, contract_triple_index, subject_union_index, filename):
+    """violates <subject1> <subject2> <description>: vectors where a contract could be violated"""
+    if len(parts) < 4:
+        print("Error: Missing subject1, subject2, or description")
+        return
+    
+    subject1 = parts[1].strip()
+    subject2 = parts[2].strip()
+    description = parts[3].strip()
+    
+    matching_ids = contract_triple_index.get((subject1, subject2, description.lower()), [])
+    if not matching_ids:
+        print(f"No contracts found with subject1='{subject1}', subject2='{subject2}', and description='{description}'")
+        return
+    
+    print(f"Found {len(matching_ids)} matching contract(s):")
+    for cid in matching_ids:
+        contract = contract_map[cid]
+        print(f"ID {cid}: description='{contract['description']}', "
+              f"subject1={contract['subject1']}, subject2={contract['subject2']}, "
+              f"type={contract['type']}, key='{contract['key']}'")
+    
+    forbidden = matching_ids
+    print(f"\nQuerying vectors where contract IDs {matching_ids} are violated:")
+    try:
+        found_vectors, _ = query_vectors(all_vectors, [], forbidden, contract_map, index=_loaded_vector_index())
+        if not found_vectors:
+            print(f"No vectors found where contract IDs {matching_ids} are violated")
+        else:
+            print(f"Found {len(found_vectors)} violation scenarios")
+    except Exception as e:
+        print(f"Error querying vectors: {e}")
+
+def _cmd_responsibility(parts, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                        key_index, clause_by_contract, contract_triple_index, subject_union_index, filename):
+    """responsibility <subject> <description> <norm_key> [fulfills|violates]: consequences for a subject"""
+    if len(parts) < 4:
+        print("Error: Missing subject, description, or norm_key")
+        return
+    
+    subject = parts[1].strip()
+    description = parts[2].strip()
+    norm_key = parts[3].strip()
+    mode = 'both' if len(parts) == 4 else parts[4].strip().lower()
+    
+    if mode not in ('fulfills', 'violates', 'both'):
+        print("Error: Mode must be 'fulfills', 'violates', or omitted (for both)")
+        return
+    
+    contract_ids = subject_union_index.get(subject, frozenset())
+    if not contract_ids:
+        print(f"No contracts found with subject='{subject}' and description='{description}'")
+        return
+    
+    # Strip keyword tags from description for matching (e.g., "(delivery/installation)" -> "")
+    clean_description = _PAREN_TAG_RE.sub('', description.lower())
+    matching_ids = []
+    for cid in contract_ids:
+        contract = contract_map.get(cid, {})
+        if contract.get('description', '').lower() == clean_description:
+            matching_ids.append(cid)
+    
+    if not matching_ids:
+        print(f"No contracts found with subject='{subject}' and description='{description}'")
+        return
+    
+    # Find the main contract
+    main_contract = contract_map[matching_ids[0]]
+    print(f"OBLIGATION ANALYSIS:")
+    print(f"Subject: {subject}")
+    print(f"Obligation: {main_contract['description']}")
+    print(f"Between: {main_contract['subject1']} and {main_contract['subject2']}")
+    
+    # Get norm information - look for contract with matching key
+    norm_cid = key_index.get(norm_key)
+    norm_contract = contract_map.get(norm_cid) if norm_cid is not None else None
+    
+    if not norm_contract:
+        print(f"No norm found with key='{norm_key}'")
+        return
+    
+    print(f"Norm found: {norm_contract['description']}")
+    
+    # Look for related clauses
+    related_clauses = clause_by_contract.get(matching_ids[0], [])
+    
+    if related_clauses:
+        print(f"Found {len(related_clauses)} related clauses")
+    
+    # Analyze the specific mode requested
+    for cid in matching_ids:
+        if mode in ('fulfills', 'both'):
+            print(f"\nFULFILLMENT ANALYSIS:")
+            try:
+                zdd_results, found_count, necessary_ids = _zdd_consequences_cached((cid,), ())
+                if found_count:
+                    # Find what other IDs are always present when this ID is fulfilled
+                    if necessary_ids:
+                        print(f"CONSEQUENCES - Always required when fulfilled:")
+                        for nid in sorted(necessary_ids - {cid}):  # Don't show the obligation itself
+                            desc, subject1, subject2 = _ds12(contract_map, nid, 'Unknown contract')
+                            print(f"  • {desc} (between {subject1} and {subject2})")
+                    else:
+                        print(f"No other obligations consistently required when fulfilled")
+                    
+                    # Show per-ZDD fulfillment consequences
+                    fulfilled_zdds = [z for z in zdd_results if z['status'] == 'FULFILLED']
+                    if fulfilled_zdds:
+                        print(f"\nFulfillment consequences by contract section:")
+                        for zdd in fulfilled_zdds:
+                            zdd_necessary = zdd['necessary_ids'] - {cid}
+                            if not zdd_necessary:
+                                continue
+                            print(f"\n  When fulfilled in {zdd['zdd_name']}:")
+                            for nid in sorted(zdd_necessary):
+                                desc = _desc(contract_map, nid, 'Unknown contract')
+                                print(f"    • {desc}")
                 else:
-                    print(f"  No vectors found containing ID {id1}")
-                
-                print(f"\nSet Z (IDs from vectors containing ID {id2}):")
-                if Z:
-                    for cid in sorted(Z):
-                        desc = contract_map.get(cid, {}).get('description', 'Unknown contract')
-                        print(f"  ID {cid}: '{desc}'")
+                    print(f"No scenarios found where obligation is fulfilled")
+            except Exception as e:
+                print(f"Error analyzing fulfillment: {e}")
+        
+        if mode in ('violates', 'both'):
+            print(f"\nVIOLATION ANALYSIS:")
+            try:
+                zdd_results, found_count, necessary_ids = _zdd_consequences_cached((), (cid,))
+                if found_count:
+                    # Find what other IDs are always present when this ID is absent
+                    if necessary_ids:
+                        print(f"CONSEQUENCES - Always present when violated:")
+                        for nid in sorted(necessary_ids):
+                            desc, subject1, subject2 = _ds12(contract_map, nid, 'Unknown contract')
+                            print(f"  • {desc} (between {subject1} and {subject2})")
+                    
+                    # Check for unsatisfiable sections (0 vectors when ID is absent)
+                    unsatisfiable_sections = []
+                    for zdd_result in zdd_results:
+                        if zdd_result['status'] == 'VIOLATED' and zdd_result['vector_count'] == 0:
+                            unsatisfiable_sections.append(zdd_result['zdd_name'])
+                    
+                    if unsatisfiable_sections:
+                        print(f"\nCRITICAL: Contract becomes invalid when obligation is violated in these sections:")
+                        for section in unsatisfiable_sections:
+                            print(f"  • {section}")
+                    
+                    # Show detailed ZDD breakdown with necessary IDs
+                    applicable_zdds = [z for z in zdd_results if z['vector_count'] > 0]
+                    if applicable_zdds:
+                        print(f"\nViolation consequences by contract section:")
+                        for zdd in applicable_zdds:
+                            if zdd['necessary_ids']:
+                                print(f"\n  When violated in {zdd['zdd_name']}:")
+                                for nid in sorted(zdd['necessary_ids']):
+                                    desc = _desc(contract_map, nid, 'Unknown contract')
+                                    print(f"    • {desc}")
                 else:
-                    print(f"  No vectors found containing ID {id2}")
+                    print(f"No scenarios found where obligation could be violated")
+            except Exception as e:
+                print(f"Error analyzing violation: {e}")
+
+def _cmd_split(parts, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+               key_index, clause_by_contract, contract_triple_index, subject_union_index, filename):
+    """split <id1> <id2>: split vectors into Y (id1 present) and Z (id2 present)"""
+    if len(parts) != 3:
+        print("Error: Must provide exactly two IDs (e.g., split 1 2)")
+        return
+    
+    try:
+        id1 = int(parts[1])
+        id2 = int(parts[2])
+    except ValueError:
+        print("Error: IDs must be integers")
+        return
+    
+    if id1 not in contract_map or id2 not in contract_map:
+        print(f"Error: One or both IDs ({id1}, {id2}) not found in contract map")
+        return
+    
+    print(f"Splitting vectors for ID {id1} ('{contract_map[id1]['description']}') and ID {id2} ('{contract_map[id2]['description']}')")
+    try:
+        Y, Z, success = split_vectors(all_vectors, id1, id2, contract_map, index=_loaded_vector_index())
+        if success:
+            print(f"\nSet Y (IDs from vectors containing ID {id1}):")
+            if Y:
+                for cid in Y:
+                    desc = _desc(contract_map, cid, 'Unknown contract')
+                    print(f"  ID {cid}: '{desc}'")
             else:
-                print("Split failed, see message above.")
-        except Exception as e:
-            print(f"Error splitting vectors: {e}")
+                print(f"  No vectors found containing ID {id1}")
+            
+            print(f"\nSet Z (IDs from vectors containing ID {id2}):")
+            if Z:
+                for cid in Z:
+                    desc = _desc(contract_map, cid, 'Unknown contract')
+                    print(f"  ID {cid}: '{desc}'")
+            else:
+                print(f"  No vectors found containing ID {id2}")
+        else:
+            print("Split failed, see message above.")
+    except Exception as e:
+        print(f"Error splitting vectors: {e}")
+
+def _cmd_permissive(parts, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                    key_index, clause_by_contract, contract_triple_index, subject_union_index, filename):
+    """permissive <id1> <id2>: check whether id1 and id2 are independent"""
+    if len(parts) != 3:
+        print("Error: Must provide exactly two IDs (e.g., permissive 1 2)")
+        return
     
-    elif cmd == 'permissive':
-        if len(parts) != 3:
-            print("Error: Must provide exactly two IDs (e.g., permissive 1 2)")
-            return
-        
-        try:
-            id1 = int(parts[1])
-            id2 = int(parts[2])
-        except ValueError:
-            print("Error: IDs must be integers")
-            return
-        
-        if id1 not in contract_map or id2 not in contract_map:
-            print(f"Error: One or both IDs ({id1}, {id2}) not found in contract map")
-            return
+    try:
+        id1 = int(parts[1])
+        id2 = int(parts[2])
+    except ValueError:
+        print("Error: IDs must be integers")
+        return
+    
+    if id1 not in contract_map or id2 not in contract_map:
+        print(f"Error: One or both IDs ({id1}, {id2}) not found in contract map")
+        return
+    
+    print(f"Checking permissive independence for ID {id1} ('{contract_map[id1]['description']}') and ID {id2} ('{contract_map[id2]['description']}')")
+    try:
+        combinations, is_independent = permissive_vectors(all_vectors, id1, id2, contract_map, index=_loaded_vector_index())
+    except Exception as e:
+        print(f"Error checking permissive independence: {e}")
+
+def _cmd_count(parts, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+               key_index, clause_by_contract, contract_triple_index, subject_union_index, filename):
+    """count: count the vectors in the file"""
+    try:
+        # The count command should still read from the file directly, as it's a simple line count
+        # and doesn't need the loaded vector data. This avoids confusion if the file is very large.
+        count = count_vector_lines(filename)
+        print(f"Total vectors in file: {count:,}")
+    except Exception as e:
+        print(f"Error counting vectors: {e}")
+
+def _cmd_sample(parts, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                key_index, clause_by_contract, contract_triple_index, subject_union_index, filename):
+    """sample <n>: show the first n vectors from the file"""
+    try:
+        # The sample command should also read from the file to show the raw lines
+        n = 10
+        if len(parts) > 1:
+            n = int(parts[1])
+            if n <= 0:
+                print("Error: Sample size must be positive")
+                return
         
-        print(f"Checking permissive independence for ID {id1} ('{contract_map[id1]['description']}') and ID {id2} ('{contract_map[id2]['description']}')")
-        try:
-            combinations, is_independent = permissive_vectors(all_vectors, id1, id2, contract_map)
-        except Exception as e:
-            print(f"Error checking permissive independence: {e}")
+        # Labels come from a dense per-ID list when the contract IDs allow one
+        labels = vector_labels(contract_map)
+        label_count = len(labels) if labels is not None else 0
+        
+        with open(filename, 'rb') as f:
+            # islice stops pulling lines as soon as n vectors have parsed
+            for vector in islice(_iter_file_vectors(f), n):
+                if labels is not None and (not vector or (min(vector) >= 0 and max(vector) < label_count)):
+                    # Every ID has a label: the join runs entirely in C
+                    details = ', '.join(map(labels.__getitem__, vector))
+                elif labels is not None:
+                    details = ', '.join([labels[vid] if 0 <= vid < label_count
+                                         else f"ID {vid}: 'Unknown contract'" for vid in vector])
+                else:
+                    details = ', '.join([f"ID {vid}: '{contract_map[vid]['description']}'"
+                                         if contract_map.get(vid) else f"ID {vid}: 'Unknown contract'"
+                                         for vid in vector])
+                print(f"Vector: {vector} -> {details}")
+    except Exception as e:
+        print(f"Error sampling vectors: {e}")
+
+# Command name -> handler; team semantic commands go through _TEAM_HANDLERS
+_HANDLERS = {
+    'help': _cmd_help,
+    'path': _cmd_path,
+    'path_zdd': _cmd_path_zdd,
+    'path_subject': _cmd_path_subject,
+    'subject1_desc': _cmd_subject1_desc,
+    'subject2_desc': _cmd_subject2_desc,
+    'is_subject1_desc': _cmd_is_subject1_desc,
+    'violates': _cmd_violates,
+    'responsibility': _cmd_responsibility,
+    'split': _cmd_split,
+    'permissive': _cmd_permissive,
+    'count': _cmd_count,
+    'sample': _cmd_sample,
+}
+
+# Commands that work from the file or the contract data alone, so
+# process_command does not load the vectors for them
+_VECTORLESS_COMMANDS = {'help', 'count', 'sample', 'subject1_desc', 'subject2_desc', 'is_subject1_desc'}
+
+# Commands that read the vector file on every run, so their output can change
+# within a session and is not replayed
+_FILE_COMMANDS = {'count', 'sample'}
+
+@contextmanager
+def _buffered_stdout():
+    """Collect a handler's report in memory and write it to stdout in one call,
+    even if the handler raises part way through"""
+    buffer = io.StringIO()
+    try:
+        with redirect_stdout(buffer):
+            yield
+    finally:
+        sys.stdout.write(buffer.getvalue())
+
+def process_command(command, get_all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                    key_index, clause_by_contract, contract_triple_index, subject_union_index, filename=None):
+    """Enhanced command processing with team semantics
     
-    elif cmd == 'count':
-        try:
-            # The count command should still read from the file directly, as it's a simple line count
-            # and doesn't need the loaded vector data. This avoids confusion if the file is very large.
-            count = 0
-            with open(filename, 'r') as f:
-                for line in f:
-                    if line.strip() and not line.startswith('#'):
-                        count += 1
-            print(f"Total vectors in file: {count:,}")
-        except Exception as e:
-            print(f"Error counting vectors: {e}")
+    get_all_vectors is called to load the vectors only by commands that use them.
+    """
+    print(f"\nProcessing command: {command}")
     
-    elif cmd == 'sample':
-        try:
-            # The sample command should also read from the file to show the raw lines
-            n = 10
-            if len(parts) > 1:
-                n = int(parts[1])
-                if n <= 0:
-                    print("Error: Sample size must be positive")
-                    return
-            
-            with open(filename, 'r') as f:
-                count = 0
-                for line in f:
-                    if line.strip() and not line.startswith('#'):
-                        vector_match = re.search(r'\[(.*?)\]', line)
-                        if vector_match:
-                            try:
-                                vector = [int(x.strip()) for x in vector_match.group(1).split(',') if x.strip()]
-                                vector_details = []
-                                for vid in vector:
-                                    contract = contract_map.get(vid)
-                                    if contract:
-                                        vector_details.append(f"ID {vid}: '{contract['description']}'")
-                                    else:
-                                        vector_details.append(f"ID {vid}: 'Unknown contract'")
-                                print(f"Vector: {vector} -> {', '.join(vector_details)}")
-                                count += 1
-                                if count >= n:
-                                    break
-                            except ValueError:
-                                print(f"Skipping invalid vector: {line.strip()}")
-        except Exception as e:
-            print(f"Error sampling vectors: {e}")
+    try:
+        parts = shlex.split(command)
+    except ValueError as e:
+        print(f"Error: Command parsing failed. Check for unclosed quotes. Details: {e}")
+        return
+
+    if not parts:
+        return
     
-    else:
+    _dispatch_command(parts, get_all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                      key_index, clause_by_contract, contract_triple_index, subject_union_index, filename)
+
+def process_command_argv(argv, get_all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                         key_index, clause_by_contract, contract_triple_index, subject_union_index, filename=None):
+    """Run a command given as already-tokenized arguments, e.g. sys.argv[2:]
+    
+    The shell has done the quoting, so the tokens are dispatched as they are.
+    A single argument holding a whole command line ('analyze_team [1, 2]') is
+    still split like an interactive command.
+    """
+    if not argv:
+        return
+    if len(argv) == 1:
+        process_command(argv[0], get_all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                        key_index, clause_by_contract, contract_triple_index, subject_union_index, filename)
+        return
+    
+    print(f"\nProcessing command: {' '.join(argv)}")
+    _dispatch_command(argv, get_all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                      key_index, clause_by_contract, contract_triple_index, subject_union_index, filename)
+
+def _dispatch_command(parts, get_all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                      key_index, clause_by_contract, contract_triple_index, subject_union_index, filename):
+    """Route tokenized command parts to the team or regular handler"""
+    cmd = parts[0].lower()
+    
+    # Check if it's a team semantic command
+    if cmd in _TEAM_HANDLERS:
+        all_vectors = get_all_vectors()
+        with _buffered_stdout():
+            process_team_semantic_command(parts, all_vectors, contract_map)
+        return
+    
+    handler = _HANDLERS.get(cmd)
+    if handler is None:
         print(f"Unknown command: {cmd}")
+        return
+    all_vectors = None if cmd in _VECTORLESS_COMMANDS else get_all_vectors()
+    with _buffered_stdout():
+        handler(parts, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                key_index, clause_by_contract, contract_triple_index, subject_union_index, filename)
+
+def _setup_readline(contract_map):
+    """Enable line editing, persistent history and tab completion if readline exists.
+    
+    The first word completes to a command name, later words to contract IDs.
+    """
+    try:
+        import readline
+        import atexit
+    except ImportError:
+        return
+    
+    try:
+        readline.read_history_file(HISTORY_FILE)
+    except OSError:
+        pass
+    
+    def save_history():
+        try:
+            readline.write_history_file(HISTORY_FILE)
+        except OSError:
+            pass
+    atexit.register(save_history)
+    
+    command_names = sorted(_HANDLERS.keys() | _TEAM_HANDLERS.keys() | {'quit', 'exit'})
+    contract_ids = sorted(map(str, contract_map), key=lambda s: (len(s), s))
+    last = [None, []]
+    
+    def complete(text, state):
+        if state == 0:
+            words = contract_ids if readline.get_line_buffer()[:readline.get_begidx()].strip() else command_names
+            last[:] = [text, [w for w in words if w.startswith(text)]]
+        matches = last[1]
+        return matches[state] if state < len(matches) else None
+    
+    readline.set_completer(complete)
+    readline.parse_and_bind('tab: complete')
+
+def _configure_logging():
+    """Send log records to stderr as bare messages, at the level named by $ZDD_LOG (default INFO)"""
+    level = logging.getLevelName(os.environ.get('ZDD_LOG', 'INFO').upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+    logging.basicConfig(level=level, format='%(message)s')
 
 def main():
     """Main function with enhanced error handling and usage information"""
+    _configure_logging()
     if len(sys.argv) < 2:
         print("Enhanced Legal Vector Query System with Team Semantics")
         print("Usage: python enhanced_zdd_query.py <vector_file> [command]")
@@ -1427,39 +2154,53 @@ def main():
     filename = sys.argv[1]
     json_filename = "kelsen_data.json"
     
-    # Verify files exist
-    if not os.path.isfile(filename):
+    # Verify files exist with a single stat
+    try:
+        st = os.stat(filename)
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
         print(f"Error: Vector file not found: {filename}")
         sys.exit(1)
     
     try:
-        contract_map, subject1_index, subject2_index, clause_map, matrix_map = load_kelsen_data(json_filename)
+        contract_map, subject1_index, subject2_index, clause_map, matrix_map, key_index, clause_by_contract, contract_triple_index, subject_union_index = load_kelsen_data(json_filename)
         print(f"Loaded {len(contract_map)} contracts from {json_filename}")
     except Exception as e:
         print(f"Error loading JSON: {e}")
         print("Note: Some features may not work without kelsen_data.json")
-        contract_map, subject1_index, subject2_index, clause_map, matrix_map = {}, {}, {}, {}, {}
+        contract_map, subject1_index, subject2_index, clause_map, matrix_map, key_index, clause_by_contract, contract_triple_index, subject_union_index = {}, {}, {}, {}, {}, {}, {}, {}, {}
 
-    # Load all vectors into memory for efficiency
-    all_vectors = load_vectors_from_file(filename)
-    if not all_vectors and os.path.isfile(filename):
-        print(f"Warning: No vectors were loaded from {filename}. File might be empty or invalid.", file=sys.stderr)
-    elif all_vectors:
-        print(f"Loaded {len(all_vectors)} vectors into memory for analysis.")
+    # Load all vectors into memory on first use; count, sample and the
+    # contract lookups never need them
+    loaded = []
+    def get_all_vectors():
+        if not loaded:
+            all_vectors = load_vectors_from_file(filename)
+            if not all_vectors:
+                log.warning("Warning: No vectors were loaded from %s. File might be empty or invalid.", filename)
+            elif all_vectors:
+                print(f"Loaded {len(all_vectors)} vectors into memory for analysis.")
+            loaded.append(all_vectors)
+        return loaded[0]
 
     # Check if we're in single-command mode or interactive mode
     if len(sys.argv) > 2 or not sys.stdin.isatty():
-        if len(sys.argv) > 2:
-            command = ' '.join(sys.argv[2:])
-        else:
-            command = sys.stdin.read().strip()
+        argv = sys.argv[2:]
+        command = None if argv else sys.stdin.read().strip()
         
-        if not command:
+        if not (command or any(arg.strip() for arg in argv)):
             print("Error: No command provided")
             sys.exit(1)
         
         try:
-            process_command(command, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map, filename)
+            if argv:
+                # Dispatch the shell's tokens directly rather than re-joining and re-splitting them
+                process_command_argv(argv, get_all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                                     key_index, clause_by_contract, contract_triple_index, subject_union_index, filename)
+            else:
+                process_command(command, get_all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                                key_index, clause_by_contract, contract_triple_index, subject_union_index, filename)
         except Exception as e:
             print(f"Error processing command: {e}")
             import traceback
@@ -1472,6 +2213,12 @@ def main():
     if contract_map:
         print(f"Using legal contract data from {json_filename}")
     print("Type 'help' for available commands, 'quit' or 'exit' to quit")
+    _setup_readline(contract_map)
+    
+    # Output of earlier commands keyed by the command line; a repeated query
+    # is replayed instead of re-run. Only commands answered from data already
+    # in memory are kept, so the vector file is never touched for a replay
+    outputs = OrderedDict()
     
     while True:
         try:
@@ -1483,7 +2230,29 @@ def main():
                 print("Goodbye!")
                 break
                 
-            process_command(command, all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map, filename)
+            key = command
+            if key in outputs:
+                outputs.move_to_end(key)
+                sys.stdout.write(outputs[key])
+                continue
+            
+            was_loaded = bool(loaded)
+            buffer = io.StringIO()
+            try:
+                with redirect_stdout(buffer):
+                    process_command(command, get_all_vectors, contract_map, subject1_index, subject2_index, clause_map, matrix_map,
+                                    key_index, clause_by_contract, contract_triple_index, subject_union_index, filename)
+            finally:
+                sys.stdout.write(buffer.getvalue())
+            # Skip commands that re-read the file, runs that reported an error,
+            # and the run that loaded the vectors so its load notice is not replayed
+            output = buffer.getvalue()
+            cmd = command.split(maxsplit=1)[0].lower()
+            if (cmd not in _FILE_COMMANDS and not _ERROR_LINE_RE.search(output)
+                    and bool(loaded) == was_loaded):
+                outputs[key] = output
+                if len(outputs) > REPL_CACHE_SIZE:
+                    outputs.popitem(last=False)
             
         except KeyboardInterrupt:
             print("\nGoodbye!")